@@ -0,0 +1,463 @@
+import argparse
+import functools
+import itertools
+import json
+import random
+import sys
+import time
+import tracemalloc
+import types
+from contextlib import contextmanager
+
+import ping_pong
+import ping_pong_multiball
+import snake
+from snake_snapshot import board_config, load
+
+
+# In-memory stand-ins for the tkinter pieces the games use, so they can be
+# driven without a display. The canvas counts items and calls per frame.
+
+class FakeWidget:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+    def __getitem__(self, key):
+        return FakeWidget()
+
+
+class FakeMaster(FakeWidget):
+    def after(self, delay, callback):
+        # The benchmark drives the loop itself
+        self.pending = callback
+
+
+class FakeStringVar:
+    def __init__(self, master=None, value=None):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class FakeCanvas(FakeWidget):
+    def __init__(self, *args, **kwargs):
+        self.items = {}
+        self.ids = itertools.count(1)
+        self.created = 0
+        self.calls = 0
+
+    def _create(self, *coords, **options):
+        self.calls += 1
+        self.created += 1
+        item = next(self.ids)
+        self.items[item] = [list(coords), options]
+        return item
+
+    create_rectangle = create_oval = create_line = create_text = _create
+    create_window = create_image = _create
+
+    def coords(self, item, *coords):
+        self.calls += 1
+        self.items[item][0] = list(coords)
+
+    def itemconfig(self, item, **options):
+        self.calls += 1
+        if item in self.items:
+            self.items[item][1].update(options)
+
+    def delete(self, item):
+        self.calls += 1
+        if item == "all":
+            self.items.clear()
+        else:
+            self.items.pop(item, None)
+
+    def tag_raise(self, *args):
+        self.calls += 1
+
+
+class FakePhotoImage(FakeWidget):
+    # Counts put() calls, which cost a frame what canvas calls do
+    puts = 0
+
+    def put(self, data, to=None):
+        FakePhotoImage.puts += 1
+
+
+fake_tk = types.SimpleNamespace(
+    Tk=FakeMaster, Canvas=FakeCanvas, PhotoImage=FakePhotoImage, Frame=FakeWidget, Label=FakeWidget,
+    Button=FakeWidget, OptionMenu=FakeWidget, StringVar=FakeStringVar,
+    LEFT="left", X="x",
+)
+
+
+class FakeClock:
+    # Replaces the time module in ping_pong so game_loop sees exact frames
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self):
+        return self.now
+
+
+@contextmanager
+def headless(clock):
+    saved = snake.tk, ping_pong.tk, ping_pong.time
+    snake.tk = ping_pong.tk = fake_tk
+    ping_pong.time = clock
+    try:
+        yield
+    finally:
+        snake.tk, ping_pong.tk, ping_pong.time = saved
+
+
+# Snake scenarios
+
+def hamiltonian_cycle(cols, rows):
+    # A cycle through every cell (rows must be even): snake along the rows
+    # from column 1, then come back up column 0
+    cells = []
+    for y in range(rows):
+        xs = range(1, cols) if y % 2 == 0 else range(cols - 1, 0, -1)
+        cells.extend((x, y) for x in xs)
+    cells.extend((0, y) for y in range(rows - 1, -1, -1))
+    return cells
+
+
+def direction_between(a, b):
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    return {(-1, 0): "Left", (1, 0): "Right", (0, -1): "Up", (0, 1): "Down"}[(dx, dy)]
+
+
+class CycleDriver:
+    # Follows a Hamiltonian cycle, so the snake never runs into itself
+    def __init__(self, game):
+        cycle = hamiltonian_cycle(game.cols, game.rows)
+        cs = game.cell_size
+        self.cycle = [(x * cs, y * cs) for x, y in cycle]
+        self.next_direction = {
+            self.cycle[i]: direction_between(cycle[i], cycle[(i + 1) % len(cycle)])
+            for i in range(len(cycle))
+        }
+
+    def body(self, length, start=0):
+        # Snake of the given length lying along the cycle, head first
+        n = len(self.cycle)
+        return [self.cycle[(start + i) % n] for i in range(length - 1, -1, -1)]
+
+    def __call__(self, game):
+        game.change_direction(self.next_direction[game.snake[0]])
+
+
+class GreedyDriver:
+    # Heads for the food, avoiding walls, body and obstacles where it can
+    steps = {"Left": (-1, 0), "Right": (1, 0), "Up": (0, -1), "Down": (0, 1)}
+
+    def __call__(self, game):
+        x, y = game.snake[0]
+        fx, fy = game.food if game.food is not None else (x, y)
+        safe = []
+        for direction, (dx, dy) in self.steps.items():
+            index = game.cell_index((x + dx * game.cell_size, y + dy * game.cell_size))
+            if index is not None and game.grid[index] == 0:
+                gain = abs(fx - x) + abs(fy - y) - abs(fx - x - dx * game.cell_size) - abs(fy - y - dy * game.cell_size)
+                safe.append((gain, direction))
+        if safe:
+            game.change_direction(max(safe)[1])
+
+
+def load_snake(game, body, obstacles=()):
+    game.set_board(body, obstacles)
+    game.direction = direction_between(
+        (body[1][0] // game.cell_size, body[1][1] // game.cell_size),
+        (body[0][0] // game.cell_size, body[0][1] // game.cell_size),
+    )
+    game.score = 0
+    game.is_game_over = False
+    game.food = game.create_food()
+    game.renderer.reset()
+    game.draw_objects()
+
+
+def snake_default(game, rng):
+    driver = GreedyDriver()
+    return driver, lambda: game.restart_game()
+
+
+def snake_long(game, rng):
+    driver = CycleDriver(game)
+    length = len(driver.cycle) // 2
+    return driver, lambda: load_snake(game, driver.body(length))
+
+
+def snake_full(game, rng):
+    # Leave only the first two rows of the cycle free, about 30 cells where
+    # food can go
+    driver = CycleDriver(game)
+    free = 2 * (game.cols - 1)
+    return driver, lambda: load_snake(game, driver.body(len(driver.cycle) - free, free))
+
+
+def snake_obstacles(game, rng):
+    driver = GreedyDriver()
+    cells = [
+        (x * game.cell_size, y * game.cell_size)
+        for x in range(1, game.cols - 1) for y in range(1, game.rows - 1)
+        if not (y == 5 and x < 8)
+    ]
+    obstacles = rng.sample(cells, len(cells) // 4)
+    return driver, lambda: load_snake(game, [(100, 100), (80, 100), (60, 100)], obstacles)
+
+
+def snake_state(game, rng, path):
+    # Start every game from a saved snapshot (--snake-state)
+    driver = GreedyDriver()
+    return driver, lambda: load(path, game)
+
+
+def snake_huge(game, rng):
+    # 500x500 cells, drawn by BitmapRenderer, with a long snake on the cycle
+    driver = CycleDriver(game)
+    return driver, lambda: load_snake(game, driver.body(len(driver.cycle) // 4))
+
+
+# Ping Pong scenarios
+
+def pong_tracker(game):
+    # Play the left paddle like someone holding the arrow keys: hold the
+    # key toward the ball through the game's Keyboard, which the game loop
+    # polls each physics step
+    center = game.player_y + game.paddle_height / 2
+    if center < game.ball_y - 5:
+        want = "Down"
+    elif center > game.ball_y + 5:
+        want = "Up"
+    else:
+        want = None
+    keyboard = game.keyboard
+    for key in ("Up", "Down"):
+        event = types.SimpleNamespace(keysym=key)
+        if key == want and not keyboard.is_held(key):
+            keyboard.press(event)
+        elif key != want:
+            keyboard.release(event)
+
+
+def pong_default(game, rng):
+    return pong_tracker, game.reset_game
+
+
+def pong_fast(game, rng):
+    serve = game.reset_ball
+
+    def fast_serve():
+        serve()
+        game.ball_speed_x *= 6
+        game.ball_speed_y = rng.uniform(-20, 20)
+
+    game.reset_ball = fast_serve
+    return (lambda game: None), game.reset_game
+
+
+def pong_multiball(game, rng):
+    # 500 balls; the left paddle follows the ball closest to it
+    def tracker(game):
+        nearest = game.x.argmin()
+        game.ball_y = game.y[nearest]
+        pong_tracker(game)
+
+    return tracker, game.reset_game
+
+
+SCENARIOS = {
+    "snake_default": snake_default,
+    "snake_long": snake_long,
+    "snake_full": snake_full,
+    "snake_obstacles": snake_obstacles,
+    "snake_huge": snake_huge,
+    "pong_default": pong_default,
+    "pong_fast": pong_fast,
+    "pong_multiball": pong_multiball,
+}
+
+# Game classes and board settings for scenarios that don't use the default 600x400 board
+GAMES = {
+    "pong_multiball": ping_pong_multiball.MultiBallGame,
+}
+BOARDS = {
+    "snake_huge": {"width": 1000, "height": 1000, "cell_size": 2},
+}
+
+
+def timed(method, totals, name):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter_ns()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            totals[name] += time.perf_counter_ns() - start
+    return wrapper
+
+
+ALLOC_FRAMES = 100
+
+
+def traced_allocations(prepare, frame, frames):
+    # Average Python allocations of a frame under tracemalloc: the peak
+    # memory in use above what it started with (KiB), and the net blocks
+    # it leaves allocated. Tracing slows every allocation down, so this
+    # runs apart from the timed frames.
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    peak = blocks = 0
+    tracemalloc.start()
+    try:
+        for _ in range(frames):
+            prepare()
+            before = tracemalloc.take_snapshot().filter_traces(ignore)
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            frame()
+            peak += tracemalloc.get_traced_memory()[1] - current
+            after = tracemalloc.take_snapshot().filter_traces(ignore)
+            blocks += sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    finally:
+        tracemalloc.stop()
+    return peak / frames / 1024, blocks / frames
+
+
+def run_scenario(name, ticks, seed):
+    random.seed(seed)
+    rng = random.Random(seed)
+    clock = FakeClock()
+    with headless(clock):
+        is_snake = name.startswith("snake")
+        game = GAMES.get(name, snake.SnakeGame if is_snake else ping_pong.PingPongGame)(FakeMaster(), **BOARDS.get(name, {}))
+        driver, reset = SCENARIOS[name](game, rng)
+
+        # Per-method time; work outside the timed frames (reset, load)
+        # is left out below
+        phases = ("move_snake", "check_collisions", "draw_objects") if is_snake else ("move_ai", "update_ball", "draw_objects")
+        totals = dict.fromkeys(phases, 0)
+        for phase in phases:
+            setattr(game, phase, timed(getattr(game, phase), totals, phase))
+
+        if is_snake:
+            frame = game.update
+        else:
+            game.toggle_game()
+
+            def frame():
+                clock.now += game.step_time
+                game.game_loop()
+
+        reset()
+        canvas = game.canvas
+        frame_ns = []
+        phase_ns = dict.fromkeys(phases, 0)
+        created = calls = restarts = 0
+        for _ in range(ticks):
+            if game.is_game_over:
+                reset()
+                restarts += 1
+            driver(game)
+            created_before, calls_before = canvas.created, canvas.calls + FakePhotoImage.puts
+            totals_before = dict(totals)
+            start = time.perf_counter_ns()
+            frame()
+            frame_ns.append(time.perf_counter_ns() - start)
+            for phase in phases:
+                phase_ns[phase] += totals[phase] - totals_before[phase]
+            created += canvas.created - created_before
+            calls += canvas.calls + FakePhotoImage.puts - calls_before
+
+        def prepare():
+            if game.is_game_over:
+                reset()
+            driver(game)
+
+        alloc_kib, alloc_blocks = traced_allocations(prepare, frame, min(ticks, ALLOC_FRAMES))
+
+    frame_ns.sort()
+    total = sum(frame_ns)
+    return {
+        "ticks_per_second": ticks / (total / 1e9),
+        "p50_us": frame_ns[len(frame_ns) // 2] / 1000,
+        "p99_us": frame_ns[min(len(frame_ns) - 1, len(frame_ns) * 99 // 100)] / 1000,
+        "items_per_frame": created / ticks,
+        "canvas_calls_per_frame": calls / ticks,
+        "alloc_kib_per_frame": alloc_kib,
+        "alloc_blocks_per_frame": alloc_blocks,
+        "restarts": restarts,
+        "phases_us": {phase: phase_ns[phase] / ticks / 1000 for phase in phases},
+    }
+
+
+def compare(results, baseline, tolerance):
+    # Returns the list of regressions against a stored baseline
+    regressions = []
+    for name, current in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]
+        if current["ticks_per_second"] < old["ticks_per_second"] * (1 - tolerance):
+            regressions.append(f"{name}: ticks/s {old['ticks_per_second']:.0f} -> {current['ticks_per_second']:.0f}")
+        if current["p99_us"] > old["p99_us"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {old['p99_us']:.1f}us -> {current['p99_us']:.1f}us")
+        if current["items_per_frame"] > old["items_per_frame"] * (1 + tolerance) + 0.01:
+            regressions.append(f"{name}: items/frame {old['items_per_frame']:.2f} -> {current['items_per_frame']:.2f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-tick and per-frame costs of Snake and Ping Pong")
+    parser.add_argument("--ticks", type=int, default=5000, help="ticks per scenario")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                        help="scenario to run (repeatable, default: all)")
+    parser.add_argument("--save", metavar="FILE", help="store the results as a baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare against a stored baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown")
+    parser.add_argument("--snake-state", metavar="FILE",
+                        help="also run snake_state, which starts from this snapshot (see snake_snapshot.py)")
+    args = parser.parse_args()
+
+    names = args.scenario or list(SCENARIOS)
+    if args.snake_state:
+        with open(args.snake_state, "rb") as f:
+            config = board_config(f.read(64))
+        SCENARIOS["snake_state"] = functools.partial(snake_state, path=args.snake_state)
+        BOARDS["snake_state"] = {key: config[key] for key in ("width", "height", "cell_size")}
+        names.append("snake_state")
+
+    results = {}
+    print(f"{'Scenario':<16} {'ticks/s':>10} {'p50 us':>8} {'p99 us':>8} {'items/fr':>9} {'calls/fr':>9} "
+          f"{'KiB/fr':>7} {'blocks/fr':>9}  phases (us/tick)")
+    for name in names:
+        stats = results[name] = run_scenario(name, args.ticks, args.seed)
+        phases = " ".join(f"{phase}={us:.1f}" for phase, us in stats["phases_us"].items())
+        print(f"{name:<16} {stats['ticks_per_second']:>10.0f} {stats['p50_us']:>8.1f} {stats['p99_us']:>8.1f} "
+              f"{stats['items_per_frame']:>9.2f} {stats['canvas_calls_per_frame']:>9.2f} "
+              f"{stats['alloc_kib_per_frame']:>7.1f} {stats['alloc_blocks_per_frame']:>9.2f}  {phases}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
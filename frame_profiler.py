@@ -0,0 +1,134 @@
+import csv
+import time
+from array import array
+
+
+class FrameProfiler:
+    """Per-frame phase timings for the game loops.
+
+    A frame is begin(), then mark(phase) after each phase, then end().
+    mark() adds the time since the previous mark to that phase, so a phase
+    can be marked several times in one frame (e.g. once per physics step).
+    The last `size` frames are kept in a ring buffer of fixed arrays.
+    While disabled every call returns straight away.
+    """
+
+    def __init__(self, phases, budget_ms, size=600, enabled=False):
+        self.phases = tuple(phases)
+        self.columns = {phase: i for i, phase in enumerate(self.phases)}
+        self.budget_ns = int(budget_ms * 1_000_000)
+        self.size = size
+        self.enabled = enabled
+
+        self.starts = array("q", [0]) * size
+        self.work = array("q", [0]) * size
+        self.times = [array("q", [0]) * size for _ in self.phases]
+        self.frames = 0  # frames recorded so far, the ring holds the last `size`
+        self.missed = 0  # frames that started more than half a frame late
+        self.slot = 0
+        self.last_mark = 0
+        self.last_start = None
+
+        # Optional on-canvas overlay
+        self.canvas = None
+        self.overlay_x = 0
+        self.overlay_every = 15  # frames between overlay refreshes
+
+    def begin(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        if self.last_start is not None and now - self.last_start > self.budget_ns * 3 // 2:
+            self.missed += 1
+        self.last_start = now
+        self.last_mark = now
+
+        slot = self.slot = self.frames % self.size
+        self.starts[slot] = now
+        for column in self.times:
+            column[slot] = 0
+
+    def mark(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        self.times[self.columns[phase]][self.slot] += now - self.last_mark
+        self.last_mark = now
+
+    def end(self):
+        if not self.enabled:
+            return
+        self.work[self.slot] = time.perf_counter_ns() - self.starts[self.slot]
+        self.frames += 1
+        if self.canvas is not None and self.frames % self.overlay_every == 0:
+            self.draw_overlay()
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        self.last_start = None
+
+    def skip(self):
+        # Forget the previous frame, e.g. after a pause or a restart, so the
+        # gap is not counted as a missed deadline
+        self.last_start = None
+
+    def recent(self):
+        # Slots of the frames in the ring, oldest first
+        count = min(self.frames, self.size)
+        first = self.frames - count
+        return [i % self.size for i in range(first, self.frames)]
+
+    def summary(self):
+        slots = self.recent()
+        if len(slots) < 2:
+            return None
+        span = self.starts[slots[-1]] - self.starts[slots[0]]
+        return {
+            "fps": (len(slots) - 1) * 1e9 / span if span else 0.0,
+            "missed": self.missed,
+            "ms": {
+                phase: sum(column[s] for s in slots) / len(slots) / 1e6
+                for phase, column in zip(self.phases, self.times)
+            },
+        }
+
+    def show_overlay(self, canvas, width=0):
+        # Show FPS, missed deadlines and the phase breakdown in the top
+        # right corner of canvas (None hides it again)
+        if self.canvas is not None:
+            self.canvas.delete("profiler")
+        self.canvas = canvas
+        self.overlay_x = width - 10
+
+    def draw_overlay(self):
+        stats = self.summary()
+        if stats is None:
+            return
+        text = f"FPS {stats['fps']:.0f}  missed {stats['missed']}\n" + "\n".join(
+            f"{phase:<10} {ms:6.3f} ms" for phase, ms in stats["ms"].items()
+        )
+        if not self.canvas.find_withtag("profiler"):
+            # The game may have cleared the canvas since the last refresh
+            self.canvas.create_text(
+                self.overlay_x, 10, anchor="ne", tags="profiler",
+                fill="yellow", font=("Courier", 10), justify="left"
+            )
+        self.canvas.itemconfig("profiler", text=text)
+        self.canvas.tag_raise("profiler")
+
+    def dump_csv(self, path):
+        # One row per recorded frame; idle is the time between frames spent
+        # outside the game (Tk event processing and waiting)
+        slots = self.recent()
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "start_ms"] + [f"{phase}_ms" for phase in self.phases] + ["work_ms", "idle_ms"])
+            first = self.frames - len(slots)
+            for n, slot in enumerate(slots):
+                following = slots[n + 1] if n + 1 < len(slots) else None
+                idle = (self.starts[following] - self.starts[slot] - self.work[slot]) if following is not None else 0
+                writer.writerow(
+                    [first + n, f"{(self.starts[slot] - self.starts[slots[0]]) / 1e6:.3f}"]
+                    + [f"{column[slot] / 1e6:.3f}" for column in self.times]
+                    + [f"{self.work[slot] / 1e6:.3f}", f"{max(0, idle) / 1e6:.3f}"]
+                )
@@ -0,0 +1,50 @@
+from collections import deque
+
+
+class Keyboard:
+    # Polled key state for the game loops. Tk reports <KeyPress> and
+    # <KeyRelease>; instead of acting on each event (which ties movement to
+    # the OS key repeat) the loop asks once per tick which keys are held.
+    # Presses are also queued, so several taps within one tick are kept
+    # and can be handled one per tick.
+    def __init__(self, master, keys, queue_size=3):
+        self.keys = set(keys)
+        self.held = set()
+        self.presses = deque()
+        self.queue_size = queue_size
+        master.bind("<KeyPress>", self.press)
+        master.bind("<KeyRelease>", self.release)
+        master.bind("<FocusOut>", self.clear)
+
+    def press(self, event):
+        key = event.keysym
+        if key not in self.keys:
+            return
+        # Auto-repeat on a held key sends more presses (on X11 each after a
+        # release). They add nothing to the queue, and would fill it and
+        # drop the next real press.
+        repeat = key in self.held or (self.presses and self.presses[-1] == key)
+        self.held.add(key)
+        # Drop new presses rather than old ones when the queue is full
+        if not repeat and len(self.presses) < self.queue_size:
+            self.presses.append(key)
+
+    def release(self, event):
+        self.held.discard(event.keysym)
+
+    def clear(self, event=None):
+        # Keys released while the window had no focus never report it
+        self.held.clear()
+        self.presses.clear()
+
+    def is_held(self, *keys):
+        return any(key in self.held for key in keys)
+
+    def axis(self, negative, positive):
+        # -1, 0 or 1; holding both directions cancels out
+        if not self.held:
+            return 0
+        return self.is_held(*positive) - self.is_held(*negative)
+
+    def next_press(self):
+        return self.presses.popleft() if self.presses else None
@@ -0,0 +1,71 @@
+import argparse
+import importlib
+import tkinter as tk
+
+from welcome import welcome
+
+# Game name -> (module, class). Modules are imported on first use, so the
+# menu comes up without loading either game.
+GAMES = {
+    "snake": ("snake", "SnakeGame"),
+    "pong": ("ping_pong", "PingPongGame"),
+}
+TITLES = {"snake": "Snake", "pong": "Ping Pong"}
+
+
+class Launcher:
+    # One Tk root and one interpreter for every game: the menu lives in the
+    # root window and each game gets a Toplevel. Closing a game brings the
+    # menu back, and the next game reuses the modules already imported.
+    def __init__(self, root):
+        self.root = root
+        self.root.title("Games")
+        self.root.resizable(False, False)
+        self.root.configure(bg="black")
+        self.game = None
+
+        tk.Label(
+            root, text=welcome(), font=("Arial", 18, "bold"), bg="black", fg="white"
+        ).pack(padx=40, pady=(20, 10))
+        for name, title in TITLES.items():
+            tk.Button(
+                root, text=title, width=14, font=("Arial", 12),
+                command=lambda name=name: self.start(name)
+            ).pack(pady=5)
+        tk.Button(root, text="Quit", width=14, font=("Arial", 12), command=root.destroy).pack(pady=(5, 20))
+
+    def start(self, name):
+        module_name, class_name = GAMES[name]
+        game_class = getattr(importlib.import_module(module_name), class_name)
+
+        window = tk.Toplevel(self.root)
+        window.protocol("WM_DELETE_WINDOW", window.destroy)
+        window.bind("<Destroy>", lambda event: self.closed(event, window))
+        self.root.withdraw()
+        self.game = game_class(window)
+        window.focus_force()
+
+    def closed(self, event, window):
+        # <Destroy> fires for every child widget too; only the window counts
+        if event.widget is not window:
+            return
+        if self.game is not None:
+            self.game.close()
+            self.game = None
+        self.root.deiconify()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Start Snake or Ping Pong from one process")
+    parser.add_argument("game", nargs="?", choices=list(GAMES), help="start this game straight away")
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    launcher = Launcher(root)
+    if args.game:
+        launcher.start(args.game)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
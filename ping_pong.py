@@ -1,36 +1,173 @@
-import tkinter as tk
-import random
+import os
+import time
 
-class PingPongGame:
+from frame_profiler import FrameProfiler
+from game_input import Keyboard
+from pong_core import DIFFICULTIES, DIFFICULTY, PADDLE, RESET, PingPongCore
+from replay import Recorder
+
+try:
+    import tkinter as tk
+except ImportError:  # headless: the rules are in pong_core and still import
+    tk = None
+
+class PingPongRenderer:
+    # Retained-mode drawing for PingPongGame. Every canvas item is created
+    # once; a frame only moves the paddles and the ball with coords(), and
+    # the scores are updated when they change. The centre line is a
+    # permanent layer and the welcome and game over screens are cached
+    # groups of items that are shown or hidden by tag.
+    def __init__(self, game):
+        self.game = game
+        self.canvas = game.canvas
+        width, height = game.width, game.height
+        
+        # Middle line, visible behind the welcome screen and the game
+        for y in range(0, height, 20):
+            self.canvas.create_line(width // 2, y, width // 2, y + 10, fill="white", width=2, tags="centre")
+        
+        # Scores, paddles and ball
+        self.player_score_item = self.canvas.create_text(
+            width // 4, 30, text="0", font=("Arial", 36, "bold"), fill="white", tags="play"
+        )
+        self.ai_score_item = self.canvas.create_text(
+            3 * width // 4, 30, text="0", font=("Arial", 36, "bold"), fill="white", tags="play"
+        )
+        self.scores = (0, 0)
+        self.player_item = self.canvas.create_rectangle(0, 0, 0, 0, fill="white", tags="play")
+        self.ai_item = self.canvas.create_rectangle(0, 0, 0, 0, fill="white", tags="play")
+        # Ball with a subtle glow effect
+        self.glow_item = self.canvas.create_oval(0, 0, 0, 0, fill="gray70", outline="", tags="play")
+        self.ball_item = self.canvas.create_oval(0, 0, 0, 0, fill="white", outline="", tags="play")
+        
+        # Welcome screen
+        self.canvas.create_text(
+            width // 2, height // 2 - 80, text="PING PONG",
+            font=("Arial", 36, "bold"), fill="white", tags="welcome"
+        )
+        self.canvas.create_text(
+            width // 2, height // 2 - 20, text="First to score 10 points wins!",
+            font=("Arial", 18), fill="white", tags="welcome"
+        )
+        self.canvas.create_text(
+            width // 2, height // 2 + 20, text="Press 'Start' to begin",
+            font=("Arial", 18), fill="white", tags="welcome"
+        )
+        self.canvas.create_text(
+            width // 2, height // 2 + 60, text="Controls: Up/Down arrows to move, Space to pause",
+            font=("Arial", 14), fill="white", tags="welcome"
+        )
+        
+        # Game over screen: overlay and game over text with shadow effect
+        self.canvas.create_rectangle(0, 0, width, height, fill="black", tags="game_over")
+        self.canvas.create_text(
+            width // 2 + 2, height // 2 - 80 + 2, text="GAME OVER",
+            font=("Arial", 36, "bold"), fill="#333333", tags="game_over"
+        )
+        self.canvas.create_text(
+            width // 2, height // 2 - 80, text="GAME OVER",
+            font=("Arial", 36, "bold"), fill="white", tags="game_over"
+        )
+        self.winner_item = self.canvas.create_text(
+            width // 2, height // 2 - 20, text="",
+            font=("Arial", 30, "bold"), tags="game_over"
+        )
+        self.final_score_item = self.canvas.create_text(
+            width // 2, height // 2 + 40, text="",
+            font=("Arial", 18), fill="white", tags="game_over"
+        )
+        self.canvas.create_text(
+            width // 2, height // 2 + 100, text="Press 'Reset' to play again or 'Esc' to quit",
+            font=("Arial", 14), fill="white", tags="game_over"
+        )
+        
+        self.screen = None
+    
+    def show(self, screen):
+        # Switch between the "welcome", "play" and "game_over" screens
+        if screen == self.screen:
+            return
+        self.screen = screen
+        visible = {
+            "welcome": ("centre", "welcome"),
+            "play": ("centre", "play"),
+            "game_over": ("game_over",),
+        }[screen]
+        for tag in ("centre", "play", "welcome", "game_over"):
+            self.canvas.itemconfig(tag, state="normal" if tag in visible else "hidden")
+    
+    def show_game_over(self, winner):
+        game = self.game
+        self.canvas.itemconfig(
+            self.winner_item, text=winner,
+            fill="green" if winner == "YOU WIN!" else "red"
+        )
+        self.canvas.itemconfig(
+            self.final_score_item,
+            text=f"Final Score: {game.player_score} - {game.ai_score}"
+        )
+        self.show("game_over")
+    
+    def draw(self, alpha=1.0):
+        # Moving objects are drawn between their last two physics positions
+        game = self.game
+        self.show("play")
+        
+        if game.player_score != self.scores[0]:
+            self.canvas.itemconfig(self.player_score_item, text=str(game.player_score))
+        if game.ai_score != self.scores[1]:
+            self.canvas.itemconfig(self.ai_score_item, text=str(game.ai_score))
+        self.scores = (game.player_score, game.ai_score)
+        
+        self.canvas.coords(
+            self.player_item,
+            0, game.player_y,
+            game.paddle_width, game.player_y + game.paddle_height
+        )
+        ai_y = game.prev_ai_y + (game.ai_y - game.prev_ai_y) * alpha
+        self.canvas.coords(
+            self.ai_item,
+            game.width - game.paddle_width, ai_y,
+            game.width, ai_y + game.paddle_height
+        )
+        self.draw_ball(alpha)
+    
+    def draw_ball(self, alpha):
+        game = self.game
+        x = game.prev_ball_x + (game.ball_x - game.prev_ball_x) * alpha
+        y = game.prev_ball_y + (game.ball_y - game.prev_ball_y) * alpha
+        r = game.ball_radius
+        self.canvas.coords(self.glow_item, x - r - 2, y - r - 2, x + r + 2, y + r + 2)
+        self.canvas.coords(self.ball_item, x - r, y - r, x + r, y + r)
+    
+
+class PingPongGame(PingPongCore):
+    # The rules live in PingPongCore; this class draws the game, reads keys
+    # and runs the real-time loop
+    renderer_class = PingPongRenderer
+    
     def __init__(self, master):
         self.master = master
         self.master.title("Ping Pong")
         self.master.resizable(False, False)
         self.master.configure(bg="black")
         
-        # Game settings
-        self.width = 800
-        self.height = 500
-        self.paddle_speed = 8
-        self.ball_speed_x = 4
-        self.ball_speed_y = 4
-        self.ball_radius = 10
-        self.paddle_width = 15
-        self.paddle_height = 80
-        self.difficulty = "Medium"  # Easy, Medium, Hard
-        self.ai_speed_map = {"Easy": 3, "Medium": 5, "Hard": 7}
-        self.winning_score = 10
-        
-        # Game state
-        self.player_score = 0
-        self.ai_score = 0
-        self.ball_x = self.width // 2
-        self.ball_y = self.height // 2
-        self.player_y = self.height // 2 - self.paddle_height // 2
-        self.ai_y = self.height // 2 - self.paddle_height // 2
+        # Game settings and state
+        PingPongCore.__init__(self)
+        self.max_steps = 5  # most updates run in one frame when catching up
         self.is_running = False
         self.is_paused = False
-        self.is_game_over = False
+        
+        # Loop timing
+        self.after_id = None
+        self.last_time = None
+        self.next_frame = None
+        self.accumulator = 0.0
+        
+        # Inputs of the whole session, see replay.py. Resets are recorded
+        # before the next physics step.
+        self.recorder = Recorder(self.kind, self.seed, self.config())
+        self.reset_pending = 0
         
         # Create menu frame
         self.menu_frame = tk.Frame(master, bg="black")
@@ -41,7 +178,7 @@ class PingPongGame:
         self.difficulty_label.pack(side=tk.LEFT, padx=10, pady=5)
         
         self.difficulty_var = tk.StringVar(value=self.difficulty)
-        self.difficulty_options = ["Easy", "Medium", "Hard"]
+        self.difficulty_options = list(DIFFICULTIES)
         self.difficulty_menu = tk.OptionMenu(self.menu_frame, self.difficulty_var, *self.difficulty_options, command=self.set_difficulty)
         self.difficulty_menu.config(width=8, bg="black", fg="white", activebackground="gray")
         self.difficulty_menu["menu"].config(bg="black", fg="white", activebackground="gray")
@@ -58,16 +195,62 @@ class PingPongGame:
         # Create canvas for the game
         self.canvas = tk.Canvas(master, width=self.width, height=self.height, bg="black", highlightthickness=0)
         self.canvas.pack(padx=10, pady=10)
+        self.renderer = self.renderer_class(self)
+        
+        # Frame profiler, off until toggled with F3
+        self.profiler = FrameProfiler(("input", "ai", "physics", "draw"), self.step_time * 1000)
         
-        # Set keyboard bindings
-        self.master.bind("<Up>", self.move_player_up)
-        self.master.bind("<Down>", self.move_player_down)
+        # Set keyboard bindings. The paddle keys are polled once per
+        # physics step, see move_player
+        self.keyboard = Keyboard(self.master, ("Up", "Down", "w", "s"))
+        self.held_direction = 0
+        self.held_steps = 0
         self.master.bind("<space>", self.toggle_pause)
         self.master.bind("<Escape>", self.quit_game)
+        self.master.bind("<F3>", self.toggle_profiler)
+        
+        # GAME_PROFILE=<file.csv> starts with the profiler on. close() saves
+        # the recorded frames and, with GAME_RECORD=<file>, the inputs for
+        # replay.py; it runs when the window goes away, whether this script
+        # or launcher.py opened it.
+        self.closed = False
+        self.master.bind("<Destroy>", self.destroyed, add="+")
+        if os.environ.get("GAME_PROFILE"):
+            self.toggle_profiler()
         
         # Show welcome screen
         self.show_welcome()
     
+    def stop(self):
+        # Cancel the next scheduled frame, e.g. before the window goes away
+        if self.after_id is not None:
+            self.master.after_cancel(self.after_id)
+            self.after_id = None
+    
+    def close(self):
+        # Stop for good and save the profile and recording
+        if self.closed:
+            return
+        self.closed = True
+        self.stop()
+        if self.profiler.frames:
+            self.profiler.dump_csv(os.environ.get("GAME_PROFILE") or "ping_pong_frames.csv")
+        record_path = os.environ.get("GAME_RECORD")
+        if record_path:
+            self.record_inputs()
+            self.recorder.finish().save(record_path)
+    
+    def destroyed(self, event):
+        # <Destroy> also fires for each child widget; only the window counts
+        if event.widget is self.master:
+            self.close()
+    
+    def toggle_profiler(self, event=None):
+        # Turn frame timing and its on-canvas overlay on or off
+        enabled = not self.profiler.enabled
+        self.profiler.set_enabled(enabled)
+        self.profiler.show_overlay(self.canvas if enabled else None, self.width)
+    
     def set_difficulty(self, value):
         self.difficulty = value
     
@@ -78,6 +261,7 @@ class PingPongGame:
             self.is_paused = False
             self.is_game_over = False
             self.start_button.config(text="Pause", bg="orange")
+            self.last_time = None
             self.game_loop()
         else:
             # Toggle pause
@@ -96,15 +280,9 @@ class PingPongGame:
                 self.start_button.config(text="Pause", bg="orange")
     
     def reset_game(self):
-        # Reset scores and positions
-        self.player_score = 0
-        self.ai_score = 0
-        self.reset_ball()
-        self.player_y = self.height // 2 - self.paddle_height // 2
-        self.ai_y = self.height // 2 - self.paddle_height // 2
-        
-        # Reset game state
-        self.is_game_over = False
+        # Reset scores, positions and game state
+        self.reset_match()
+        self.reset_pending += 1
         self.is_paused = False
         
         # If game is not running, show welcome; otherwise draw new state
@@ -117,40 +295,7 @@ class PingPongGame:
         self.master.destroy()
     
     def show_welcome(self):
-        self.canvas.delete("all")
-        
-        # Draw middle line
-        for y in range(0, self.height, 20):
-            self.canvas.create_line(self.width // 2, y, self.width // 2, y + 10, fill="white", width=2)
-        
-        # Draw welcome text
-        self.canvas.create_text(
-            self.width // 2, self.height // 2 - 80,
-            text="PING PONG",
-            font=("Arial", 36, "bold"),
-            fill="white"
-        )
-        
-        self.canvas.create_text(
-            self.width // 2, self.height // 2 - 20,
-            text="First to score 10 points wins!",
-            font=("Arial", 18),
-            fill="white"
-        )
-        
-        self.canvas.create_text(
-            self.width // 2, self.height // 2 + 20,
-            text="Press 'Start' to begin",
-            font=("Arial", 18),
-            fill="white"
-        )
-        
-        self.canvas.create_text(
-            self.width // 2, self.height // 2 + 60,
-            text="Controls: Up/Down arrows to move, Space to pause",
-            font=("Arial", 14),
-            fill="white"
-        )
+        self.renderer.show("welcome")
     
     def show_game_over(self):
         self.is_game_over = True
@@ -158,229 +303,151 @@ class PingPongGame:
         self.start_button.config(text="Start", bg="green")
         
         winner = "YOU WIN!" if self.player_score > self.ai_score else "AI WINS!"
-        
-        # Create overlay
-        self.canvas.delete("all")
-        self.canvas.create_rectangle(
-            0, 0, self.width, self.height,
-            fill="black"
-        )
-        
-        # Draw game over text with shadow effect
-        self.canvas.create_text(
-            self.width // 2 + 2, self.height // 2 - 80 + 2,
-            text="GAME OVER",
-            font=("Arial", 36, "bold"),
-            fill="#333333"
-        )
-        self.canvas.create_text(
-            self.width // 2, self.height // 2 - 80,
-            text="GAME OVER",
-            font=("Arial", 36, "bold"),
-            fill="white"
-        )
-        
-        # Winner text with appropriate color
-        self.canvas.create_text(
-            self.width // 2, self.height // 2 - 20,
-            text=winner,
-            font=("Arial", 30, "bold"),
-            fill="green" if winner == "YOU WIN!" else "red"
-        )
-        
-        # Final score
-        self.canvas.create_text(
-            self.width // 2, self.height // 2 + 40,
-            text=f"Final Score: {self.player_score} - {self.ai_score}",
-            font=("Arial", 18),
-            fill="white"
-        )
-        
-        # Instructions
-        self.canvas.create_text(
-            self.width // 2, self.height // 2 + 100,
-            text="Press 'Reset' to play again or 'Esc' to quit",
-            font=("Arial", 14),
-            fill="white"
-        )
+        self.renderer.show_game_over(winner)
     
-    def move_player_up(self, event=None):
-        if self.is_running and not self.is_paused and not self.is_game_over:
-            self.player_y = max(0, self.player_y - self.paddle_speed)
+    def move_player(self):
+        # Move the paddle for the keys held during this step; holding Up and
+        # Down together keeps it still
+        direction = self.keyboard.axis(("Up", "w"), ("Down", "s"))
+        if direction != self.held_direction:
+            self.held_direction = direction
+            self.held_steps = 0
+        if direction == 0:
+            return
+        speed = min(self.paddle_speed, self.key_speed + self.key_acceleration * self.held_steps)
+        self.held_steps += 1
+        self.player_y = max(0, min(self.height - self.paddle_height, self.player_y + direction * speed))
     
-    def move_player_down(self, event=None):
-        if self.is_running and not self.is_paused and not self.is_game_over:
-            self.player_y = min(self.height - self.paddle_height, self.player_y + self.paddle_speed)
-    
-    def move_ai(self):
-        ai_speed = self.ai_speed_map[self.difficulty]
-        ai_center = self.ai_y + self.paddle_height // 2
-        ball_center = self.ball_y
-        
-        # Add some prediction based on ball direction
-        if self.ball_speed_x > 0:  # Ball moving toward AI
-            # Predict where ball will be when it reaches AI paddle
-            distance_to_ai = self.width - self.paddle_width - self.ball_x
-            time_to_impact = distance_to_ai / self.ball_speed_x if self.ball_speed_x != 0 else 0
-            predicted_y = self.ball_y + self.ball_speed_y * time_to_impact
-            
-            # Adjust prediction to stay within bounds
-            predicted_y = max(self.ball_radius, min(predicted_y, self.height - self.ball_radius))
-            ball_center = predicted_y
-        
-        # Add some randomness for easier difficulties
-        if self.difficulty == "Easy":
-            ball_center += random.randint(-30, 30)
-        elif self.difficulty == "Medium":
-            ball_center += random.randint(-15, 15)
-        
-        # Move AI paddle toward ball
-        if ai_center < ball_center - 5:  # Add a small deadzone to prevent jitter
-            self.ai_y = min(self.height - self.paddle_height, self.ai_y + ai_speed)
-        elif ai_center > ball_center + 5:
-            self.ai_y = max(0, self.ai_y - ai_speed)
+    def draw_objects(self, alpha=1.0):
+        # alpha is how far we are between the last two physics updates
+        self.renderer.draw(alpha)
     
-    def reset_ball(self):
-        self.ball_x = self.width // 2
-        self.ball_y = self.height // 2
-        
-        # Randomize ball direction on reset, but ensure it's not too vertical
-        self.ball_speed_x = random.choice([-4, 4])
-        self.ball_speed_y = random.uniform(-3, 3)
+    def record_inputs(self):
+        # Inputs as the next physics step will see them
+        recorder = self.recorder
+        if self.reset_pending:
+            recorder.record(RESET, self.reset_pending, force=True)
+            self.reset_pending = 0
+        recorder.record(PADDLE, self.player_y)
+        recorder.record(DIFFICULTY, DIFFICULTIES.index(self.difficulty))
     
-    def update_ball(self):
-        # Move ball
-        self.ball_x += self.ball_speed_x
-        self.ball_y += self.ball_speed_y
-        
-        # Ball collision with top and bottom walls
-        if self.ball_y <= self.ball_radius or self.ball_y >= self.height - self.ball_radius:
-            self.ball_speed_y *= -1
-            # Adjust ball position to prevent sticking
-            if self.ball_y <= self.ball_radius:
-                self.ball_y = self.ball_radius
-            else:
-                self.ball_y = self.height - self.ball_radius
-        
-        # Ball collision with paddles
-        # Player paddle
-        if (self.ball_x - self.ball_radius <= self.paddle_width and 
-            self.player_y <= self.ball_y <= self.player_y + self.paddle_height and
-            self.ball_speed_x < 0):  # Only bounce if moving towards paddle
-                
-            # Reflect ball based on where it hit the paddle
-            relative_intersect_y = (self.player_y + self.paddle_height / 2) - self.ball_y
-            normalized_intersect_y = relative_intersect_y / (self.paddle_height / 2)
-            
-            # Set new direction based on bounce angle
-            speed = max(4, (self.ball_speed_x**2 + self.ball_speed_y**2) ** 0.5)
-            self.ball_speed_x = abs(speed * 0.8)  # Ensure it moves right
-            self.ball_speed_y = -normalized_intersect_y * speed * 0.7
-            
-            # Increase speed slightly
-            self.ball_speed_x *= 1.05
+    def game_loop(self):
+        if self.is_running:
+            # Physics runs in fixed steps of step_time driven by the monotonic
+            # clock, so game speed does not depend on how long a frame takes
+            now = time.perf_counter()
+            if self.last_time is None:
+                self.last_time = now
+                self.next_frame = now
+            elapsed = now - self.last_time
+            self.last_time = now
             
-            # Move ball past paddle to prevent multiple collisions
-            self.ball_x = self.paddle_width + self.ball_radius + 1
-        
-        # AI paddle
-        if (self.ball_x + self.ball_radius >= self.width - self.paddle_width and 
-            self.ai_y <= self.ball_y <= self.ai_y + self.paddle_height and
-            self.ball_speed_x > 0):  # Only bounce if moving towards paddle
+            if not self.is_paused and not self.is_game_over:
+                profiler = self.profiler
+                profiler.begin()
                 
-            # Reflect ball based on where it hit the paddle
-            relative_intersect_y = (self.ai_y + self.paddle_height / 2) - self.ball_y
-            normalized_intersect_y = relative_intersect_y / (self.paddle_height / 2)
-            
-            # Set new direction based on bounce angle
-            speed = max(4, (self.ball_speed_x**2 + self.ball_speed_y**2) ** 0.5)
-            self.ball_speed_x = -abs(speed * 0.8)  # Ensure it moves left
-            self.ball_speed_y = -normalized_intersect_y * speed * 0.7
-            
-            # Increase speed slightly
-            self.ball_speed_x *= 1.05
-            
-            # Move ball past paddle to prevent multiple collisions
-            self.ball_x = self.width - self.paddle_width - self.ball_radius - 1
-        
-        # Ball out of bounds (scoring)
-        if self.ball_x < 0:
-            self.ai_score += 1
-            self.reset_ball()
-            
-            # Check for game over
-            if self.ai_score >= self.winning_score:
-                self.show_game_over()
-        
-        elif self.ball_x > self.width:
-            self.player_score += 1
-            self.reset_ball()
+                self.accumulator += elapsed
+                steps = 0
+                while self.accumulator >= self.step_time and steps < self.max_steps:
+                    self.move_player()
+                    self.record_inputs()
+                    profiler.mark("input")
+                    self.step()
+                    self.recorder.advance()
+                    self.accumulator -= self.step_time
+                    steps += 1
+                    if self.is_game_over:
+                        break
+                
+                # Too far behind to catch up: drop the backlog
+                if steps == self.max_steps:
+                    self.accumulator = min(self.accumulator, self.step_time)
+                
+                # update_ball may have ended the game; keep its screen up
+                if not self.is_game_over:
+                    self.draw_objects(min(self.accumulator / self.step_time, 1.0))
+                    profiler.mark("draw")
+                profiler.end()
+            else:
+                self.accumulator = 0.0
+                self.profiler.skip()
             
-            # Check for game over
-            if self.player_score >= self.winning_score:
-                self.show_game_over()
+            # Continue the game loop at the next frame deadline (~60 FPS)
+            # instead of 16 ms after this frame's work
+            self.next_frame += self.step_time
+            if self.next_frame < now:
+                self.next_frame = now + self.step_time
+            delay = round((self.next_frame - time.perf_counter()) * 1000)
+            self.after_id = self.master.after(max(1, delay), self.game_loop)
+
+
+class NetPongGame(PingPongGame):
+    # Plays one side of a `pong_net.py serve` match. The paddle keys feed a
+    # MatchClient, which moves our paddle at once and shows the ball and
+    # the other player as the server sends them.
+    def __init__(self, master, address):
+        from pong_net import MatchClient, UdpClient  # sockets and asyncio, only for network play
+        self.client = MatchClient()
+        self.connection = UdpClient(address)
+        self.net_direction = 0
+        self.over_shown = False
+        PingPongGame.__init__(self, master)
     
-    def draw_objects(self):
-        self.canvas.delete("all")
-        
-        # Draw middle line
-        for y in range(0, self.height, 20):
-            self.canvas.create_line(self.width // 2, y, self.width // 2, y + 10, fill="white", width=2)
-        
-        # Draw scores
-        self.canvas.create_text(
-            self.width // 4, 30,
-            text=str(self.player_score),
-            font=("Arial", 36, "bold"),
-            fill="white"
-        )
-        
-        self.canvas.create_text(
-            3 * self.width // 4, 30,
-            text=str(self.ai_score),
-            font=("Arial", 36, "bold"),
-            fill="white"
-        )
-        
-                # Draw player paddle
-        self.canvas.create_rectangle(
-            0, self.player_y,
-            self.paddle_width, self.player_y + self.paddle_height,
-            fill="white"
-        )
-        
-        # Draw AI paddle
-        self.canvas.create_rectangle(
-            self.width - self.paddle_width, self.ai_y,
-            self.width, self.ai_y + self.paddle_height,
-            fill="white"
-        )
-        
-        # Draw ball with a subtle glow effect
-        self.canvas.create_oval(
-            self.ball_x - self.ball_radius - 2, self.ball_y - self.ball_radius - 2,
-            self.ball_x + self.ball_radius + 2, self.ball_y + self.ball_radius + 2,
-            fill="gray70", outline=""
-        )
-        self.canvas.create_oval(
-            self.ball_x - self.ball_radius, self.ball_y - self.ball_radius,
-            self.ball_x + self.ball_radius, self.ball_y + self.ball_radius,
-            fill="white", outline=""
-        )
+    def move_player(self):
+        self.net_direction = self.keyboard.axis(("Up", "w"), ("Down", "s"))
     
-    def game_loop(self):
-        if self.is_running:
-            if not self.is_paused and not self.is_game_over:
-                self.move_ai()
-                self.update_ball()
-                self.draw_objects()
-            
-            # Continue the game loop
-            self.master.after(16, self.game_loop)  # ~60 FPS
+    def record_inputs(self):
+        # The server owns the match, so there is nothing to replay locally
+        pass
+    
+    def reset_game(self):
+        # Ask the server for a new match; it starts once the old one is over
+        self.client.reset_requested = True
+        self.is_paused = False
+        self.is_game_over = False
+    
+    def step(self):
+        for data in self.connection.receive():
+            self.client.receive(data)
+        self.connection.send(self.client.step(self.net_direction))
+        view = self.client.view()
+        if view is None:
+            return
+        self.ball_x, self.ball_y = view.ball_x, view.ball_y
+        self.player_y, self.ai_y = view.player_y, view.ai_y
+        self.player_score, self.ai_score = view.player_score, view.ai_score
+        self.prev_ball_x, self.prev_ball_y, self.prev_ai_y = self.ball_x, self.ball_y, self.ai_y
+        if view.is_game_over and not self.over_shown:
+            self.over_shown = True
+            self.show_game_over()
+        elif not view.is_game_over:
+            self.over_shown = False
+    
+    def show_game_over(self):
+        PingPongGame.show_game_over(self)
+        # We may be on the right, where PingPongGame has the AI
+        scores = (self.player_score, self.ai_score)
+        if self.client.side:
+            scores = scores[::-1]
+        self.renderer.show_game_over("YOU WIN!" if scores[0] > scores[1] else "YOU LOSE!")
 
 
 if __name__ == "__main__":
     root = tk.Tk()
-    game = PingPongGame(root)
+    
+    # PONG_BALLS=<n> plays the multi-ball mode with n balls
+    # PONG_SERVER=<host:port> plays one side of a `pong_net.py serve` match
+    balls = int(os.environ.get("PONG_BALLS", "1"))
+    server = os.environ.get("PONG_SERVER")
+    if server:
+        from pong_net import parse_address
+        game = NetPongGame(root, parse_address(server))
+    elif balls > 1:
+        from ping_pong_multiball import MultiBallGame  # needs NumPy
+        game = MultiBallGame(root, balls)
+    else:
+        game = PingPongGame(root)
+    
+    # The profile and recording are saved by game.close()
     root.mainloop()
         
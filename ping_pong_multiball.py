@@ -0,0 +1,32 @@
+from ping_pong import PingPongGame, PingPongRenderer
+from pong_multiball import MultiBallCore
+
+
+class MultiBallRenderer(PingPongRenderer):
+    # One oval per ball, created once and moved with coords() each frame.
+    # The single ball items of PingPongRenderer stay at zero size.
+    def __init__(self, game):
+        PingPongRenderer.__init__(self, game)
+        self.ball_items = [
+            self.canvas.create_oval(0, 0, 0, 0, fill="white", outline="", tags="play")
+            for _ in range(game.ball_count)
+        ]
+
+    def draw_ball(self, alpha):
+        game = self.game
+        xs = game.prev_x + (game.x - game.prev_x) * alpha
+        ys = game.prev_y + (game.y - game.prev_y) * alpha
+        r = game.ball_radius
+        coords = self.canvas.coords
+        for item, x, y in zip(self.ball_items, xs.tolist(), ys.tolist()):
+            coords(item, x - r, y - r, x + r, y + r)
+
+
+class MultiBallGame(MultiBallCore, PingPongGame):
+    # PingPongGame's window, keys and loop with MultiBallCore's rules
+    renderer_class = MultiBallRenderer
+
+    def __init__(self, master, balls=500):
+        self.ball_count = balls  # the renderer and recorder need it first
+        PingPongGame.__init__(self, master)
+        self.setup_balls(balls)
@@ -0,0 +1,233 @@
+import random
+
+from frame_profiler import FrameProfiler
+
+DIFFICULTIES = ("Easy", "Medium", "Hard")
+
+# Input channels used by recordings (see replay.py)
+PADDLE = 0  # player paddle position
+DIFFICULTY = 1  # index into DIFFICULTIES
+RESET = 2  # number of match resets before this step
+
+
+class PingPongCore:
+    # Ping Pong rules without any drawing. PingPongGame adds the tkinter
+    # window and the real-time loop on top; replays and other headless tools
+    # use this class directly.
+
+    # Headless games are never profiled; PingPongGame sets its own profiler
+    profiler = FrameProfiler((), 0)
+
+    # Recording kind, see replay.py
+    kind = "pong"
+
+    def __init__(self, seed=None, difficulty="Medium"):
+        # Game settings
+        self.width = 800
+        self.height = 500
+        self.paddle_speed = 8
+        self.key_speed = 4  # paddle pixels per physics step while a key is held
+        self.key_acceleration = 0  # extra pixels per step for each step held (0 = off)
+        self.ball_speed_x = 4
+        self.ball_speed_y = 4
+        self.ball_radius = 10
+        self.paddle_width = 15
+        self.paddle_height = 80
+        self.difficulty = difficulty  # Easy, Medium, Hard
+        self.ai_speed_map = {"Easy": 3, "Medium": 5, "Hard": 7}
+        self.ai_noise_map = {"Easy": 30, "Medium": 15, "Hard": 0}  # aim error in pixels
+        self.winning_score = 10
+        self.step_time = 1 / 60  # seconds of physics per update
+
+        # Every random choice comes from self.rng, so the seed and the
+        # inputs are enough to replay a session
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+
+        # Game state
+        self.player_score = 0
+        self.ai_score = 0
+        self.ball_x = self.width // 2
+        self.ball_y = self.height // 2
+        self.player_y = self.height // 2 - self.paddle_height // 2
+        self.ai_y = self.height // 2 - self.paddle_height // 2
+        self.is_game_over = False
+
+        # Previous positions, for interpolated drawing
+        self.prev_ball_x = self.ball_x
+        self.prev_ball_y = self.ball_y
+        self.prev_ai_y = self.ai_y
+
+        # AI aim: predicted intercept (None until computed) and the error
+        # it adds to it, both fixed for the whole volley
+        self.ai_target = None
+        self.ai_noise = 0
+
+    def config(self):
+        return {"difficulty": self.difficulty}
+
+    def reset_match(self):
+        # Reset scores and positions
+        self.player_score = 0
+        self.ai_score = 0
+        self.reset_ball()
+        self.player_y = self.height // 2 - self.paddle_height // 2
+        self.ai_y = self.height // 2 - self.paddle_height // 2
+        self.prev_ai_y = self.ai_y
+        self.is_game_over = False
+
+    def show_game_over(self):
+        # Headless: just end the match (PingPongGame also shows the screen)
+        self.is_game_over = True
+
+    def new_volley(self):
+        # The ball changed direction: aim again, with a fresh error
+        spread = self.ai_noise_map[self.difficulty]
+        self.ai_noise = self.rng.randint(-spread, spread)
+        self.ai_target = None
+
+    def predict_intercept(self):
+        # Where the ball centre will be when it reaches the AI paddle,
+        # including any number of bounces off the top and bottom walls
+        distance_to_ai = self.width - self.paddle_width - self.ball_radius - self.ball_x
+        time_to_impact = max(0, distance_to_ai) / self.ball_speed_x
+        predicted_y = self.ball_y + self.ball_speed_y * time_to_impact
+
+        # The centre moves between ball_radius and height - ball_radius;
+        # unfolding the bounces makes that a band of period 2 * span
+        span = self.height - 2 * self.ball_radius
+        offset = (predicted_y - self.ball_radius) % (2 * span)
+        if offset > span:
+            offset = 2 * span - offset
+        return self.ball_radius + offset
+
+    def move_ai(self):
+        ai_speed = self.ai_speed_map[self.difficulty]
+        ai_center = self.ai_y + self.paddle_height // 2
+
+        if self.ball_speed_x > 0:  # Ball moving toward AI
+            # Predict once per volley; update_ball clears the cache when
+            # the ball's velocity changes
+            if self.ai_target is None:
+                self.ai_target = self.predict_intercept() + self.ai_noise
+            ball_center = self.ai_target
+        else:
+            ball_center = self.ball_y + self.ai_noise
+
+        # Move AI paddle toward ball
+        if ai_center < ball_center - 5:  # Add a small deadzone to prevent jitter
+            self.ai_y = min(self.height - self.paddle_height, self.ai_y + ai_speed)
+        elif ai_center > ball_center + 5:
+            self.ai_y = max(0, self.ai_y - ai_speed)
+
+    def reset_ball(self):
+        self.ball_x = self.width // 2
+        self.ball_y = self.height // 2
+
+        # Randomize ball direction on reset, but ensure it's not too vertical
+        self.ball_speed_x = self.rng.choice([-4, 4])
+        self.ball_speed_y = self.rng.uniform(-3, 3)
+        self.new_volley()
+
+        # Don't interpolate the jump back to the centre
+        self.prev_ball_x = self.ball_x
+        self.prev_ball_y = self.ball_y
+
+    def update_ball(self):
+        # Move ball
+        self.ball_x += self.ball_speed_x
+        self.ball_y += self.ball_speed_y
+
+        # Ball collision with top and bottom walls
+        if self.ball_y <= self.ball_radius or self.ball_y >= self.height - self.ball_radius:
+            self.ball_speed_y *= -1
+            self.ai_target = None
+            # Adjust ball position to prevent sticking
+            if self.ball_y <= self.ball_radius:
+                self.ball_y = self.ball_radius
+            else:
+                self.ball_y = self.height - self.ball_radius
+
+        # Ball collision with paddles
+        # Player paddle
+        if (self.ball_x - self.ball_radius <= self.paddle_width and
+            self.player_y <= self.ball_y <= self.player_y + self.paddle_height and
+            self.ball_speed_x < 0):  # Only bounce if moving towards paddle
+
+            # Reflect ball based on where it hit the paddle
+            relative_intersect_y = (self.player_y + self.paddle_height / 2) - self.ball_y
+            normalized_intersect_y = relative_intersect_y / (self.paddle_height / 2)
+
+            # Set new direction based on bounce angle
+            speed = max(4, (self.ball_speed_x**2 + self.ball_speed_y**2) ** 0.5)
+            self.ball_speed_x = abs(speed * 0.8)  # Ensure it moves right
+            self.ball_speed_y = -normalized_intersect_y * speed * 0.7
+
+            # Increase speed slightly
+            self.ball_speed_x *= 1.05
+
+            # Move ball past paddle to prevent multiple collisions
+            self.ball_x = self.paddle_width + self.ball_radius + 1
+            self.new_volley()
+
+        # AI paddle
+        if (self.ball_x + self.ball_radius >= self.width - self.paddle_width and
+            self.ai_y <= self.ball_y <= self.ai_y + self.paddle_height and
+            self.ball_speed_x > 0):  # Only bounce if moving towards paddle
+
+            # Reflect ball based on where it hit the paddle
+            relative_intersect_y = (self.ai_y + self.paddle_height / 2) - self.ball_y
+            normalized_intersect_y = relative_intersect_y / (self.paddle_height / 2)
+
+            # Set new direction based on bounce angle
+            speed = max(4, (self.ball_speed_x**2 + self.ball_speed_y**2) ** 0.5)
+            self.ball_speed_x = -abs(speed * 0.8)  # Ensure it moves left
+            self.ball_speed_y = -normalized_intersect_y * speed * 0.7
+
+            # Increase speed slightly
+            self.ball_speed_x *= 1.05
+
+            # Move ball past paddle to prevent multiple collisions
+            self.ball_x = self.width - self.paddle_width - self.ball_radius - 1
+            self.new_volley()
+
+        # Ball out of bounds (scoring)
+        if self.ball_x < 0:
+            self.ai_score += 1
+            self.reset_ball()
+
+            # Check for game over
+            if self.ai_score >= self.winning_score:
+                self.show_game_over()
+
+        elif self.ball_x > self.width:
+            self.player_score += 1
+            self.reset_ball()
+
+            # Check for game over
+            if self.player_score >= self.winning_score:
+                self.show_game_over()
+
+    def apply_input(self, channel, value):
+        # Replay one recorded input
+        if channel == PADDLE:
+            self.player_y = value
+        elif channel == DIFFICULTY:
+            self.difficulty = DIFFICULTIES[value]
+        elif channel == RESET:
+            for _ in range(value):
+                self.reset_match()
+
+    def tick(self):
+        self.step()
+        return self.is_game_over
+
+    def step(self):
+        # One fixed-size physics update
+        self.prev_ball_x = self.ball_x
+        self.prev_ball_y = self.ball_y
+        self.prev_ai_y = self.ai_y
+        self.move_ai()
+        self.profiler.mark("ai")
+        self.update_ball()
+        self.profiler.mark("physics")
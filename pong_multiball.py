@@ -0,0 +1,211 @@
+import numpy as np
+
+from pong_core import PingPongCore
+
+
+class SpatialHash:
+    """Uniform grid for finding touching balls without checking every pair.
+
+    Cells are one ball diameter wide, so a ball can only touch balls in its
+    own cell or the 8 around it. The grid has a spare ring of cells so that
+    neighbour lookups never leave it.
+    """
+
+    def __init__(self, width, height, cell_size):
+        self.cell_size = cell_size
+        self.cols = int(width // cell_size) + 3
+        self.rows = int(height // cell_size) + 3
+        # Own cell, then the right, lower-left, lower and lower-right
+        # neighbours: with these every pair of neighbouring cells is
+        # looked at once
+        cols = self.cols
+        self.offsets = np.array([0, 1, cols - 1, cols, cols + 1])
+
+    def pairs(self, x, y):
+        # Indices (i, j) of every pair of balls in neighbouring cells
+        n = len(x)
+        cx = np.clip((x // self.cell_size).astype(np.intp) + 1, 1, self.cols - 2)
+        cy = np.clip((y // self.cell_size).astype(np.intp) + 1, 1, self.rows - 2)
+        keys = cy * self.cols + cx
+
+        # table[cell] lists the balls in that cell, padded with -1
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        counts = np.bincount(keys, minlength=self.cols * self.rows)
+        starts = np.cumsum(counts) - counts
+        table = np.full((self.cols * self.rows, counts.max()), -1, dtype=np.intp)
+        table[sorted_keys, np.arange(n) - starts[sorted_keys]] = order
+
+        # candidates[i, k, s] is ball s of neighbour k of ball i's cell
+        candidates = table[keys[:, None] + self.offsets]
+        balls = np.broadcast_to(np.arange(n)[:, None, None], candidates.shape)
+        valid = candidates >= 0
+        # In its own cell a ball pairs only with later balls
+        valid[:, 0] &= candidates[:, 0] > balls[:, 0]
+        return balls[valid], candidates[valid]
+
+
+class MultiBallCore(PingPongCore):
+    """Ping Pong with many balls in play at once.
+
+    Ball positions and velocities are NumPy arrays and update_ball handles
+    walls, paddles and scoring for all of them with array operations.
+    Balls bounce off each other as equal masses; touching pairs come from
+    a SpatialHash. Every ball that leaves the table scores a point and
+    comes back in on the centre line. The AI paddle follows the ball that
+    will reach it first.
+    """
+
+    kind = "pong_multiball"
+
+    def __init__(self, seed=None, difficulty="Medium", balls=500):
+        PingPongCore.__init__(self, seed, difficulty)
+        self.setup_balls(balls)
+
+    def setup_balls(self, count):
+        self.ball_count = count
+        self.ball_radius = 5  # smaller balls, so hundreds fit on the table
+        self.winning_score = 100
+        self.grid = SpatialHash(self.width, self.height, 2 * self.ball_radius)
+        self.np_rng = np.random.default_rng(self.seed)
+        self.x = np.zeros(count)
+        self.y = np.zeros(count)
+        self.speed_x = np.zeros(count)
+        self.speed_y = np.zeros(count)
+        self.ai_ball = None  # index of the ball the AI is following
+        self.reset_ball()
+
+    def config(self):
+        return {"difficulty": self.difficulty, "balls": self.ball_count}
+
+    def spawn(self, balls, x_spread):
+        # Put balls back in play near the centre line with a fresh serve
+        count = len(balls)
+        rng = self.np_rng
+        r = self.ball_radius
+        self.x[balls] = self.width / 2 + rng.uniform(-x_spread, x_spread, count)
+        self.y[balls] = rng.uniform(r, self.height - r, count)
+        self.speed_x[balls] = rng.choice([-4.0, 4.0], count)
+        self.speed_y[balls] = rng.uniform(-3, 3, count)
+        self.prev_x[balls] = self.x[balls]
+        self.prev_y[balls] = self.y[balls]
+
+    def reset_ball(self):
+        # Serve every ball, spread over the middle half of the table
+        self.prev_x = np.zeros(self.ball_count)
+        self.prev_y = np.zeros(self.ball_count)
+        self.spawn(np.arange(self.ball_count), self.width / 4)
+        self.ai_ball = None
+        self.new_volley()
+
+    def threat(self):
+        # The ball that will reach the AI paddle first, or None
+        distance = self.width - self.paddle_width - self.ball_radius - self.x
+        coming = np.flatnonzero((self.speed_x > 0) & (distance >= 0))
+        if len(coming) == 0:
+            return None
+        return coming[np.argmin(distance[coming] / self.speed_x[coming])]
+
+    def move_ai(self):
+        ai_speed = self.ai_speed_map[self.difficulty]
+        ai_center = self.ai_y + self.paddle_height // 2
+
+        ball = self.threat()
+        if ball is None:
+            ball_center = self.height / 2
+        else:
+            # Aim error is fixed while the AI follows the same ball
+            if ball != self.ai_ball:
+                self.ai_ball = ball
+                self.new_volley()
+            self.ball_x, self.ball_y = self.x[ball], self.y[ball]
+            self.ball_speed_x, self.ball_speed_y = self.speed_x[ball], self.speed_y[ball]
+            ball_center = self.predict_intercept() + self.ai_noise
+
+        if ai_center < ball_center - 5:
+            self.ai_y = min(self.height - self.paddle_height, self.ai_y + ai_speed)
+        elif ai_center > ball_center + 5:
+            self.ai_y = max(0, self.ai_y - ai_speed)
+
+    def collide_balls(self):
+        # Touching balls that are moving together swap the velocity
+        # components along the line between their centres, and are pushed
+        # apart so they don't stay overlapped
+        x, y = self.x, self.y
+        i, j = self.grid.pairs(x, y)
+        dx = x[j] - x[i]
+        dy = y[j] - y[i]
+        distance2 = dx * dx + dy * dy
+        touching = (distance2 < (2 * self.ball_radius) ** 2) & (distance2 > 0)
+        if not touching.any():
+            return
+        i, j, dx, dy = i[touching], j[touching], dx[touching], dy[touching]
+        distance = np.sqrt(distance2[touching])
+        nx, ny = dx / distance, dy / distance
+
+        n = self.ball_count
+        closing = (self.speed_x[i] - self.speed_x[j]) * nx + (self.speed_y[i] - self.speed_y[j]) * ny
+        closing = np.maximum(closing, 0)
+        push_x = np.bincount(j, closing * nx, n) - np.bincount(i, closing * nx, n)
+        push_y = np.bincount(j, closing * ny, n) - np.bincount(i, closing * ny, n)
+        self.speed_x += push_x
+        self.speed_y += push_y
+
+        overlap = (2 * self.ball_radius - distance) / 2
+        x += np.bincount(j, overlap * nx, n) - np.bincount(i, overlap * nx, n)
+        y += np.bincount(j, overlap * ny, n) - np.bincount(i, overlap * ny, n)
+
+    def bounce(self, hit, paddle_y, direction):
+        # Same angles and speed-up as PingPongCore.update_ball
+        relative_intersect_y = (paddle_y + self.paddle_height / 2) - self.y[hit]
+        normalized_intersect_y = relative_intersect_y / (self.paddle_height / 2)
+        speed = np.maximum(4, np.hypot(self.speed_x[hit], self.speed_y[hit]))
+        self.speed_x[hit] = direction * speed * 0.8 * 1.05
+        self.speed_y[hit] = -normalized_intersect_y * speed * 0.7
+
+    def update_ball(self):
+        r = self.ball_radius
+        x, y = self.x, self.y
+        x += self.speed_x
+        y += self.speed_y
+
+        # Top and bottom walls
+        self.speed_y[y <= r] = np.abs(self.speed_y[y <= r])
+        self.speed_y[y >= self.height - r] = -np.abs(self.speed_y[y >= self.height - r])
+        np.clip(y, r, self.height - r, out=y)
+
+        self.collide_balls()
+
+        # Paddles, only for balls moving towards them
+        hit = (x - r <= self.paddle_width) & (self.speed_x < 0)
+        hit &= (self.player_y <= y) & (y <= self.player_y + self.paddle_height)
+        if hit.any():
+            self.bounce(hit, self.player_y, 1)
+            x[hit] = self.paddle_width + r + 1
+
+        hit = (x + r >= self.width - self.paddle_width) & (self.speed_x > 0)
+        hit &= (self.ai_y <= y) & (y <= self.ai_y + self.paddle_height)
+        if hit.any():
+            self.bounce(hit, self.ai_y, -1)
+            x[hit] = self.width - self.paddle_width - r - 1
+
+        # Scoring: every ball that got past a paddle is served again
+        out_left = x < 0
+        out_right = x > self.width
+        scored = np.flatnonzero(out_left | out_right)
+        if len(scored):
+            self.ai_score += int(np.count_nonzero(out_left))
+            self.player_score += int(np.count_nonzero(out_right))
+            self.spawn(scored, 0)
+            if max(self.player_score, self.ai_score) >= self.winning_score:
+                self.show_game_over()
+
+    def step(self):
+        # One fixed-size physics update
+        self.prev_x[:] = self.x
+        self.prev_y[:] = self.y
+        self.prev_ai_y = self.ai_y
+        self.move_ai()
+        self.profiler.mark("ai")
+        self.update_ball()
+        self.profiler.mark("physics")
@@ -0,0 +1,581 @@
+import argparse
+import asyncio
+import heapq
+import random
+import socket
+import struct
+import time
+from collections import deque
+
+from pong_core import PingPongCore
+
+# Two-player Ping Pong over datagrams. One MatchServer runs the only real
+# simulation; each MatchClient sends its paddle inputs and shows what the
+# server sends back.
+#
+#   client -> server  INPUT     ack u16 (newest snapshot received),
+#                               input seq u16 (newest input), flags u8,
+#                               count u8, then count directions i8,
+#                               oldest first
+#   server -> client  SNAPSHOT  seq u16, baseline u16, input ack u16,
+#                               info u8, changed u8, wide u8, then one
+#                               value per changed field
+#
+# Inputs are resent until acked, so a lost packet costs nothing. A snapshot
+# holds only the fields that differ from the baseline, the newest snapshot
+# the client said it has (NO_SEQ: none, every field is sent). Fields are
+# quantized to ints; a changed field is an i8 delta from the baseline, or
+# an i16 value when its bit in `wide` is set.
+
+SNAPSHOT, INPUT = 1, 2
+NO_SEQ = 0xFFFF
+RESET = 1  # input flag: start a new match if this one is over
+RIGHT_SIDE, GAME_OVER = 1, 2  # snapshot info bits
+
+INPUT_HEADER = struct.Struct("<BHHBB")
+SNAPSHOT_HEADER = struct.Struct("<BHHHBBB")
+I8 = struct.Struct("<b")
+I16 = struct.Struct("<h")
+
+# (attribute, scale): ball and paddle positions to a quarter pixel
+FIELDS = (
+    ("ball_x", 4), ("ball_y", 4), ("player_y", 4), ("ai_y", 4),
+    ("player_score", 1), ("ai_score", 1),
+)
+
+STEP_TIME = 1 / 60
+RESEND_INPUTS = 8
+# Inputs a client keeps for reconciliation until the server acks them;
+# older ones are dropped if the server stops answering
+MAX_PENDING = 120
+# Seconds without a packet before a player's slot is given up
+IDLE_TIMEOUT = 10
+
+
+def is_input(data):
+    # An INPUT packet holding all the directions its header announces
+    return (len(data) >= INPUT_HEADER.size and data[0] == INPUT
+            and len(data) >= INPUT_HEADER.size + data[INPUT_HEADER.size - 1])
+
+
+def newer(a, b):
+    # Sequence numbers wrap at 16 bits
+    return b == NO_SEQ or a != b and (a - b) & 0xFFFF < 0x8000
+
+
+def quantize(match):
+    return tuple(round(getattr(match, name) * scale) for name, scale in FIELDS)
+
+
+def encode_snapshot(seq, baseline_seq, baseline, state, input_ack, info):
+    changed = wide = 0
+    values = bytearray()
+    for i, value in enumerate(state):
+        if baseline is not None and value == baseline[i]:
+            continue
+        changed |= 1 << i
+        delta = value - baseline[i] if baseline is not None else None
+        if delta is not None and -128 <= delta < 128:
+            values += I8.pack(delta)
+        else:
+            wide |= 1 << i
+            values += I16.pack(value)
+    return SNAPSHOT_HEADER.pack(SNAPSHOT, seq, baseline_seq, input_ack, info, changed, wide) + values
+
+
+def decode_snapshot(data, baselines):
+    # Returns (seq, state, input ack, info), or None if the baseline it
+    # was built on is no longer known here
+    _, seq, baseline_seq, input_ack, info, changed, wide = SNAPSHOT_HEADER.unpack_from(data)
+    baseline = baselines.get(baseline_seq) if baseline_seq != NO_SEQ else (0,) * len(FIELDS)
+    if baseline is None:
+        return None
+    state = list(baseline)
+    pos = SNAPSHOT_HEADER.size
+    for i in range(len(FIELDS)):
+        if changed >> i & 1:
+            if wide >> i & 1:
+                (state[i],) = I16.unpack_from(data, pos)
+                pos += I16.size
+            else:
+                state[i] += I8.unpack_from(data, pos)[0]
+                pos += I8.size
+    return seq, tuple(state), input_ack, info
+
+
+def move_paddle(y, direction, match):
+    # Shared by the server and the client prediction, so they agree
+    return max(0, min(match.height - match.paddle_height, y + direction * match.paddle_speed))
+
+
+class NetMatch(PingPongCore):
+    # The rules of PingPongCore with a second player on the right paddle
+    # (ai_y) instead of move_ai
+    def move_ai(self):
+        pass
+
+
+class Player:
+    # Server-side view of one client
+    def __init__(self, send):
+        self.send = send
+        self.inputs = {}  # input seq -> direction, not applied yet
+        self.last_input = 0  # newest input applied
+        self.acked = NO_SEQ  # newest snapshot the client has
+        self.reset = False
+        self.heard = 0  # server step of the last packet
+
+
+class MatchServer:
+    """The authoritative side of a two-player match.
+
+    receive() takes a client's input packet; step() applies one queued
+    input per player (more if they fell behind), runs one physics step and
+    every `snapshot_every` steps sends each player a delta snapshot. The
+    match only runs while both players are connected. A player not heard
+    from for `idle_timeout` seconds leaves, which frees the side for
+    someone else and starts a new match.
+    """
+
+    def __init__(self, seed=None, snapshot_every=2, max_backlog=3, idle_timeout=IDLE_TIMEOUT):
+        self.match = NetMatch(seed)
+        self.snapshot_every = snapshot_every
+        self.max_backlog = max_backlog
+        self.idle_steps = round(idle_timeout / STEP_TIME)
+        self.players = [None, None]  # left and right
+        self.steps = 0
+        self.seq = 0
+        self.history = {}  # seq -> quantized state, for baselines
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def join(self, send):
+        # Returns the new player's side, or None when the match is full
+        if None not in self.players:
+            return None
+        side = self.players.index(None)
+        self.players[side] = Player(send)
+        self.players[side].heard = self.steps
+        return side
+
+    def leave(self, side):
+        self.players[side] = None
+        self.match.reset_match()
+
+    def receive(self, side, data):
+        # Packets that are not whole INPUT packets are dropped
+        self.bytes_received += len(data)
+        player = self.players[side]
+        if player is None or not is_input(data):
+            return
+        player.heard = self.steps
+        _, ack, last, flags, count = INPUT_HEADER.unpack_from(data)
+        if ack != NO_SEQ and ack in self.history and newer(ack, player.acked):
+            player.acked = ack
+        player.reset |= bool(flags & RESET)
+        directions = struct.unpack_from(f"<{count}b", data, INPUT_HEADER.size)
+        for i, direction in enumerate(directions):
+            seq = (last - count + 1 + i) & 0xFFFF
+            if newer(seq, player.last_input):
+                player.inputs[seq] = direction
+
+    def apply_input(self, side, seq, direction):
+        player = self.players[side]
+        player.last_input = seq
+        if side == 0:
+            self.match.player_y = move_paddle(self.match.player_y, direction, self.match)
+        else:
+            self.match.ai_y = move_paddle(self.match.ai_y, direction, self.match)
+
+    def apply_inputs(self, side):
+        # Inputs in order, one per step unless they are piling up
+        player = self.players[side]
+        pending = sorted(player.inputs, key=lambda seq: (seq - player.last_input) & 0xFFFF)
+        take = max(1, len(pending) - self.max_backlog)
+        for seq in pending[:take]:
+            self.apply_input(side, seq, player.inputs.pop(seq))
+
+    def step(self):
+        match = self.match
+        for side, player in enumerate(self.players):
+            if player is not None and self.steps - player.heard > self.idle_steps:
+                self.leave(side)
+        if None not in self.players:
+            if match.is_game_over and any(player.reset for player in self.players):
+                match.reset_match()
+            for player in self.players:
+                player.reset = False
+            if not match.is_game_over:
+                for side in range(2):
+                    self.apply_inputs(side)
+                match.step()
+        else:
+            # Nobody to play against yet: inputs are taken but do nothing
+            for player in self.players:
+                if player is not None and player.inputs:
+                    player.last_input = max(player.inputs, key=lambda seq: (seq - player.last_input) & 0xFFFF)
+                    player.inputs.clear()
+        self.steps += 1
+        if self.steps % self.snapshot_every == 0:
+            self.send_snapshots()
+
+    def send_snapshots(self):
+        self.seq = (self.seq + 1) & 0xFFFF
+        if self.seq == NO_SEQ:
+            self.seq = 0
+        state = quantize(self.match)
+        self.history[self.seq] = state
+        self.history.pop((self.seq - 64) & 0xFFFF, None)
+        for side, player in enumerate(self.players):
+            if player is None:
+                continue
+            baseline = self.history.get(player.acked)
+            info = side * RIGHT_SIDE | (GAME_OVER if self.match.is_game_over else 0)
+            data = encode_snapshot(
+                self.seq, player.acked if baseline is not None else NO_SEQ,
+                baseline, state, player.last_input, info,
+            )
+            self.bytes_sent += len(data)
+            player.send(data)
+
+
+class MatchClient:
+    """One player's side of a networked match.
+
+    step(direction) is called once per physics step with the keys held. It
+    moves our paddle straight away (prediction) and returns the input
+    packet to send. receive() takes a snapshot; our paddle is then set to
+    the server's position for the last input it applied, with the inputs
+    it has not seen replayed on top (reconciliation). view() gives the
+    state to draw: our predicted paddle, and the ball and the other paddle
+    interpolated between snapshots `interpolation` steps in the past.
+    """
+
+    def __init__(self, snapshot_every=2, interpolation=None):
+        self.match = NetMatch()  # settings, and the state last drawn
+        self.snapshot_every = snapshot_every
+        self.interpolation = interpolation if interpolation is not None else 2 * snapshot_every
+        self.side = 0
+        self.baselines = {}  # snapshot seq -> quantized state
+        self.latest = NO_SEQ
+        self.timeline = deque(maxlen=32)  # (server step, state)
+        self.since_latest = 0  # our steps since the newest snapshot arrived
+
+        self.input_seq = 0
+        self.pending = deque(maxlen=MAX_PENDING)  # (seq, direction) sent but not applied yet
+        self.recent = deque(maxlen=RESEND_INPUTS)  # newest directions, resent each step
+        self.predicted_y = self.match.player_y
+        self.latest_state = None
+        self.reset_requested = False
+        self.corrections = 0
+        self.correction_pixels = 0.0
+
+    def step(self, direction):
+        self.input_seq = (self.input_seq + 1) & 0xFFFF
+        self.pending.append((self.input_seq, direction))
+        self.recent.append(direction)
+        self.predicted_y = move_paddle(self.predicted_y, direction, self.match)
+        self.since_latest += 1
+
+        flags = RESET if self.reset_requested else 0
+        header = INPUT_HEADER.pack(INPUT, self.latest, self.input_seq, flags, len(self.recent))
+        return header + struct.pack(f"<{len(self.recent)}b", *self.recent)
+
+    def receive(self, data):
+        decoded = decode_snapshot(data, self.baselines)
+        if decoded is None or not newer(decoded[0], self.latest):
+            return
+        seq, state, input_ack, info = decoded
+        previous, self.latest = self.latest, seq
+        self.baselines[seq] = state
+        self.baselines.pop((seq - 64) & 0xFFFF, None)
+        self.side = info & RIGHT_SIDE
+        if not info & GAME_OVER:
+            self.reset_requested = False
+        self.latest_state = (state, bool(info & GAME_OVER))
+
+        # Server time: snapshots are numbered every snapshot_every steps, so
+        # the seq gap also covers snapshots that were lost or overtaken
+        step = self.timeline[-1][0] + ((seq - previous) & 0xFFFF) * self.snapshot_every if self.timeline else 0
+        self.timeline.append((step, state))
+        self.since_latest = 0
+
+        # Reconcile our paddle
+        while self.pending and not newer(self.pending[0][0], input_ack):
+            self.pending.popleft()
+        y = state[3 if self.side else 2] / FIELDS[2][1]
+        for _, direction in self.pending:
+            y = move_paddle(y, direction, self.match)
+        if y != self.predicted_y:
+            self.corrections += 1
+            self.correction_pixels += abs(y - self.predicted_y)
+            self.predicted_y = y
+
+    def render_step(self):
+        # The newest snapshot's step plus the time since it arrived, held
+        # `interpolation` steps back so there is a snapshot on either side
+        newest = self.timeline[-1][0] if self.timeline else 0
+        return newest + self.since_latest - self.interpolation
+
+    def view(self):
+        # The match as it should be drawn now, or None before the first
+        # snapshot
+        if self.latest_state is None:
+            return None
+        target = self.render_step()
+        timeline = self.timeline
+        before = after = timeline[-1]
+        for i in range(len(timeline) - 1, 0, -1):
+            if timeline[i - 1][0] <= target:
+                before, after = timeline[i - 1], timeline[i]
+                break
+        else:
+            before = after = timeline[0]
+        span = after[0] - before[0]
+        alpha = min(1.0, max(0.0, (target - before[0]) / span)) if span else 1.0
+        values = [
+            (a + (b - a) * alpha) / scale
+            for a, b, (_, scale) in zip(before[1], after[1], FIELDS)
+        ]
+        match = self.match
+        match.ball_x, match.ball_y, match.player_y, match.ai_y = values[:4]
+        state, game_over = self.latest_state
+        match.player_score, match.ai_score = state[4], state[5]
+        match.is_game_over = game_over
+        if self.side:
+            match.ai_y = self.predicted_y
+        else:
+            match.player_y = self.predicted_y
+        return match
+
+
+# Transports
+
+class LossyLink:
+    # Loopback stand-in for one direction of a network path, in simulated
+    # time: each packet arrives after latency plus up to jitter seconds
+    # (so packets can overtake each other), or is lost
+    def __init__(self, latency, jitter, loss, rng):
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.rng = rng
+        self.queue = []
+        self.count = 0
+        self.now = 0.0
+
+    def send(self, data):
+        if self.rng.random() < self.loss:
+            return
+        self.count += 1
+        arrival = self.now + self.latency + self.rng.uniform(0, self.jitter)
+        heapq.heappush(self.queue, (arrival, self.count, data))
+
+    def receive(self, now):
+        self.now = now
+        packets = []
+        while self.queue and self.queue[0][0] <= now:
+            packets.append(heapq.heappop(self.queue)[2])
+        return packets
+
+
+class UdpClient:
+    # Non-blocking datagram socket to a pong_net.py server, for game loops
+    def __init__(self, address):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.connect(address)
+        self.sock.setblocking(False)
+
+    def send(self, data):
+        try:
+            self.sock.send(data)
+        except OSError:
+            pass  # nobody listening yet; inputs are resent anyway
+
+    def receive(self):
+        packets = []
+        while True:
+            try:
+                packets.append(self.sock.recv(2048))
+            except (BlockingIOError, ConnectionRefusedError):
+                return packets
+
+
+class UdpServer(asyncio.DatagramProtocol):
+    # Runs a MatchServer on a UDP port; the first two addresses to send an
+    # input packet are the left and right players, until they go quiet
+    def __init__(self, server):
+        self.server = server
+        self.players = {}  # address -> (side, Player)
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        if not is_input(data):
+            return
+        side, player = self.players.get(address, (None, None))
+        if player is None or self.server.players[side] is not player:
+            # New, or timed out since: forget whoever has left, then join
+            self.players = {
+                other: entry for other, entry in self.players.items() if self.server.players[entry[0]] is entry[1]
+            }
+            side = self.server.join(lambda data: self.transport.sendto(data, address))
+            if side is None:
+                return
+            self.players[address] = (side, self.server.players[side])
+        self.server.receive(side, data)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while True:
+            deadline += STEP_TIME
+            delay = deadline - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif -delay > 5 * STEP_TIME:
+                deadline = loop.time()  # too far behind: skip ahead
+            self.server.step()
+
+
+async def serve(address, seed):
+    loop = asyncio.get_running_loop()
+    protocol = UdpServer(MatchServer(seed))
+    await loop.create_datagram_endpoint(lambda: protocol, local_addr=address)
+    await protocol.run()
+
+
+def parse_address(text):
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+# Simulated matches over LossyLinks
+
+class LoggingServer(MatchServer):
+    # Remembers the server step each input was applied at
+    def __init__(self, *args, **kwargs):
+        MatchServer.__init__(self, *args, **kwargs)
+        self.applied = ({}, {})
+
+    def apply_input(self, side, seq, direction):
+        MatchServer.apply_input(self, side, seq, direction)
+        self.applied[side][seq] = self.steps
+
+
+def tracker(match, side, rng):
+    # Play like someone holding the arrow keys, a little late
+    y = match.ai_y if side else match.player_y
+    centre = y + match.paddle_height / 2
+    if rng.random() < 0.1:
+        return 0
+    if centre < match.ball_y - 10:
+        return 1
+    if centre > match.ball_y + 10:
+        return -1
+    return 0
+
+
+def simulate(seconds, latency, jitter, loss, snapshot_every=2, seed=1):
+    # Play a match between two tracker clients over lossy links and
+    # measure bandwidth and input-to-display latency
+    rng = random.Random(seed)
+    server = LoggingServer(seed, snapshot_every)
+    clients = [MatchClient(snapshot_every) for _ in range(2)]
+    up = [LossyLink(latency, jitter, loss, rng) for _ in range(2)]
+    down = [LossyLink(latency, jitter, loss, rng) for _ in range(2)]
+    for side in range(2):
+        server.join(down[side].send)
+
+    issued = ({}, {})  # input seq -> client step it was sent at
+    render = ([], [])  # client step -> server step on screen
+    drawn = ([], [])  # client step -> inputs included in our paddle on screen
+    steps = round(seconds / STEP_TIME)
+    bytes_up = 0
+    for step in range(steps):
+        now = step * STEP_TIME
+        for side, client in enumerate(clients):
+            for data in down[side].receive(now):
+                client.receive(data)
+            view = client.view()
+            drawn[side].append(len(render[side]))  # the predicted paddle has every input sent so far
+            direction = tracker(view, side, rng) if view is not None and not view.is_game_over else 0
+            if view is not None and view.is_game_over:
+                client.reset_requested = True
+            data = client.step(direction)
+            bytes_up += len(data)
+            up[side].send(data)
+            if direction:
+                issued[side][client.input_seq] = (step, len(render[side]) + 1)
+            render[side].append(client.render_step())
+        for side in range(2):
+            for data in up[side].receive(now):
+                server.receive(side, data)
+        server.step()
+
+    # An input is on the other screen once that client draws a server
+    # step at or after the one the input was applied at
+    # An input is on our own screen once a view includes it
+    delays, own = [], []
+    for side in range(2):
+        other = render[1 - side]
+        for seq, (sent, count) in issued[side].items():
+            for shown in range(sent, steps):
+                if drawn[side][shown] >= count:
+                    own.append(shown - sent)
+                    break
+            applied = server.applied[side].get(seq)
+            if applied is None:
+                continue
+            for shown in range(sent, steps):
+                if other[shown] >= applied:
+                    delays.append(shown - sent)
+                    break
+    delays.sort()
+    return {
+        "down_bytes_per_second": server.bytes_sent / seconds,
+        "up_bytes_per_second": bytes_up / seconds,
+        "own_paddle_ms": sum(own) / len(own) * STEP_TIME * 1000 if own else None,
+        "other_paddle_ms": sum(delays) / len(delays) * STEP_TIME * 1000 if delays else None,
+        "other_paddle_p95_ms": delays[len(delays) * 95 // 100] * STEP_TIME * 1000 if delays else None,
+        "corrections": sum(client.corrections for client in clients),
+        "correction_pixels": sum(client.correction_pixels for client in clients),
+        "score": f"{server.match.player_score} - {server.match.ai_score}",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Two-player Ping Pong server, or a simulated match over a lossy link")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_parser = sub.add_parser("serve", help="host a match on a UDP port")
+    serve_parser.add_argument("address", help="host:port")
+    serve_parser.add_argument("--seed", type=int)
+    sim = sub.add_parser("simulate", help="play two bots over a simulated network")
+    sim.add_argument("--seconds", type=float, default=60)
+    sim.add_argument("--latency", type=float, default=50, help="one-way milliseconds")
+    sim.add_argument("--jitter", type=float, default=20, help="extra random milliseconds")
+    sim.add_argument("--loss", type=float, default=0.05, help="fraction of packets lost")
+    sim.add_argument("--snapshot-every", type=int, default=2, help="physics steps per snapshot")
+    sim.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        asyncio.run(serve(parse_address(args.address), args.seed))
+        return
+
+    start = time.perf_counter()
+    stats = simulate(args.seconds, args.latency / 1000, args.jitter / 1000, args.loss, args.snapshot_every, args.seed)
+    print(f"{args.seconds:.0f}s match, {args.latency:.0f}+{args.jitter:.0f} ms one way, "
+          f"{args.loss:.0%} loss (simulated in {time.perf_counter() - start:.2f}s)")
+    print(f"bandwidth: {stats['down_bytes_per_second']:.0f} B/s server to clients, "
+          f"{stats['up_bytes_per_second']:.0f} B/s clients to server (payload)")
+    print(f"own paddle: {stats['own_paddle_ms']:.0f} ms, other paddle: {stats['other_paddle_ms']:.0f} ms "
+          f"(p95 {stats['other_paddle_p95_ms']:.0f} ms)")
+    print(f"prediction corrections: {stats['corrections']} ({stats['correction_pixels']:.0f} px in total), "
+          f"score {stats['score']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from pong_core import PingPongCore
+
+# Read from the game's core, so results follow the real game's physics
+_GAME = PingPongCore(seed=0)
+SETTINGS = {
+    name: getattr(_GAME, name)
+    for name in ("width", "height", "paddle_speed", "key_speed", "ball_radius", "paddle_width", "paddle_height",
+                 "winning_score")
+}
+AI_SPEED = dict(_GAME.ai_speed_map)
+AI_NOISE = dict(_GAME.ai_noise_map)
+TICKS_PER_SECOND = round(1 / _GAME.step_time)
+# Rallies in this game settle at a constant speed, so two good paddles can
+# play forever; matches still running after this long count as unfinished
+MAX_MATCH_MINUTES = 10
+# The "human" opponent sees the ball this late, and its aim error for each
+# volley has this standard deviation in pixels
+REACTION_MS = 250
+AIM_ERROR = 30
+
+
+class MatchBatch:
+    """Many Ping Pong matches played at once, one per NumPy lane.
+
+    Follows PingPongGame's update_ball, reset_ball and move_ai rules. The AI
+    plays on the right; the left paddle is played by `opponent`:
+
+    - "human" moves key_speed per step, like a player holding an arrow key,
+      toward where the ball was `reaction_ms` ago, off by a normal error
+      with standard deviation `aim_error` pixels each volley
+    - "tracker" follows the ball at paddle_speed with no delay or error, so
+      it never misses; an upper bound rather than a player
+    - "ai:<difficulty>" is the game's AI, mirrored
+    """
+
+    def __init__(self, n, difficulty, opponent="human", seed=None, settings=SETTINGS,
+                 reaction_ms=REACTION_MS, aim_error=AIM_ERROR):
+        self.n = n
+        self.rng = np.random.default_rng(seed)
+        for name, value in settings.items():
+            setattr(self, name, value)
+        self.ai_speed = AI_SPEED[difficulty]
+        self.ai_spread = AI_NOISE[difficulty]
+        self.opponent = opponent.split(":", 1)[0]
+        if self.opponent == "human":
+            self.player_speed, self.player_spread = self.key_speed, aim_error
+        elif self.opponent == "tracker":
+            self.player_speed, self.player_spread = self.paddle_speed, None
+        elif self.opponent == "ai":
+            level = opponent.split(":", 1)[1]
+            self.player_speed, self.player_spread = AI_SPEED[level], AI_NOISE[level]
+        else:
+            raise ValueError(f"unknown opponent {opponent!r}")
+
+        start_y = self.height // 2 - self.paddle_height // 2
+        self.player_y = np.full(n, start_y, dtype=float)
+        self.ai_y = np.full(n, start_y, dtype=float)
+        self.player_score = np.zeros(n, dtype=np.int32)
+        self.ai_score = np.zeros(n, dtype=np.int32)
+        self.ball_x = np.zeros(n)
+        self.ball_y = np.zeros(n)
+        self.ball_speed_x = np.zeros(n)
+        self.ball_speed_y = np.zeros(n)
+        # Cached intercepts (NaN = not computed yet) and per-volley aim errors
+        self.ai_target = np.full(n, np.nan)
+        self.ai_noise = np.zeros(n)
+        self.player_target = np.full(n, np.nan)
+        self.player_noise = np.zeros(n)
+
+        self.done = np.zeros(n, dtype=bool)
+        self.ticks = np.zeros(n, dtype=np.int64)
+        self.hits = np.zeros(n, dtype=np.int64)  # paddle hits in the current point
+        self.rallies = []  # paddle hits per finished point
+
+        self.reset_ball(np.ones(n, dtype=bool))
+        # Ball heights of the last `reaction` steps, a ring indexed by step
+        reaction = round(reaction_ms / 1000 * TICKS_PER_SECOND)
+        self.seen = np.tile(self.ball_y, (reaction + 1, 1))
+        self.step = 0
+
+    def new_volley(self, mask):
+        count = int(mask.sum())
+        self.ai_noise[mask] = self.rng.integers(-self.ai_spread, self.ai_spread + 1, count)
+        self.ai_target[mask] = np.nan
+        if self.opponent == "human":
+            self.player_noise[mask] = self.rng.normal(0, self.player_spread, count)
+        elif self.player_spread is not None:
+            spread = self.player_spread
+            self.player_noise[mask] = self.rng.integers(-spread, spread + 1, count)
+            self.player_target[mask] = np.nan
+
+    def reset_ball(self, mask):
+        count = int(mask.sum())
+        self.ball_x[mask] = self.width // 2
+        self.ball_y[mask] = self.height // 2
+        self.ball_speed_x[mask] = self.rng.choice([-4, 4], count)
+        self.ball_speed_y[mask] = self.rng.uniform(-3, 3, count)
+        self.new_volley(mask)
+
+    def intercept(self, distance, speed):
+        # Same closed-form fold as PingPongGame.predict_intercept
+        predicted_y = self.ball_y + self.ball_speed_y * (np.maximum(distance, 0) / speed)
+        span = self.height - 2 * self.ball_radius
+        offset = (predicted_y - self.ball_radius) % (2 * span)
+        offset = np.where(offset > span, 2 * span - offset, offset)
+        return self.ball_radius + offset
+
+    def chase(self, paddle_y, target, speed, live):
+        # Move paddles toward target with the game's 5 pixel deadzone
+        center = paddle_y + self.paddle_height // 2
+        down = live & (center < target - 5)
+        up = live & (center > target + 5)
+        paddle_y[down] = np.minimum(self.height - self.paddle_height, paddle_y[down] + speed)
+        paddle_y[up] = np.maximum(0, paddle_y[up] - speed)
+
+    def move_paddles(self, live):
+        # AI (right paddle), as in move_ai
+        toward = self.ball_speed_x > 0
+        stale = live & toward & np.isnan(self.ai_target)
+        if stale.any():
+            distance = self.width - self.paddle_width - self.ball_radius - self.ball_x
+            speed = np.where(toward, self.ball_speed_x, 1)
+            self.ai_target[stale] = (self.intercept(distance, speed) + self.ai_noise)[stale]
+        target = np.where(toward, self.ai_target, self.ball_y + self.ai_noise)
+        self.chase(self.ai_y, target, self.ai_speed, live)
+
+        # Opponent (left paddle)
+        if self.opponent == "human":
+            self.seen[self.step % len(self.seen)] = self.ball_y
+            target = self.seen[(self.step + 1) % len(self.seen)] + self.player_noise
+        elif self.opponent == "tracker":
+            target = self.ball_y
+        else:
+            toward = self.ball_speed_x < 0
+            stale = live & toward & np.isnan(self.player_target)
+            if stale.any():
+                distance = self.ball_x - self.paddle_width - self.ball_radius
+                speed = np.where(toward, -self.ball_speed_x, 1)
+                self.player_target[stale] = (self.intercept(distance, speed) + self.player_noise)[stale]
+            target = np.where(toward, self.player_target, self.ball_y + self.player_noise)
+        self.chase(self.player_y, target, self.player_speed, live)
+
+    def bounce(self, hit, paddle_y, direction):
+        # Reflect the ball based on where it hit the paddle
+        relative = (paddle_y[hit] + self.paddle_height / 2) - self.ball_y[hit]
+        normalized = relative / (self.paddle_height / 2)
+        speed = np.maximum(4, np.hypot(self.ball_speed_x[hit], self.ball_speed_y[hit]))
+        self.ball_speed_x[hit] = direction * np.abs(speed * 0.8) * 1.05
+        self.ball_speed_y[hit] = -normalized * speed * 0.7
+        self.hits[hit] += 1
+        self.new_volley(hit)
+
+    def update_ball(self, live):
+        r = self.ball_radius
+        self.ball_x[live] += self.ball_speed_x[live]
+        self.ball_y[live] += self.ball_speed_y[live]
+
+        # Top and bottom walls
+        wall = live & ((self.ball_y <= r) | (self.ball_y >= self.height - r))
+        self.ball_speed_y[wall] *= -1
+        self.ball_y[wall] = np.where(self.ball_y[wall] <= r, r, self.height - r)
+        self.ai_target[wall] = np.nan
+        self.player_target[wall] = np.nan
+
+        # Player paddle
+        hit = (live & (self.ball_x - r <= self.paddle_width)
+               & (self.player_y <= self.ball_y) & (self.ball_y <= self.player_y + self.paddle_height)
+               & (self.ball_speed_x < 0))
+        self.bounce(hit, self.player_y, 1)
+        self.ball_x[hit] = self.paddle_width + r + 1
+
+        # AI paddle
+        hit = (live & (self.ball_x + r >= self.width - self.paddle_width)
+               & (self.ai_y <= self.ball_y) & (self.ball_y <= self.ai_y + self.paddle_height)
+               & (self.ball_speed_x > 0))
+        self.bounce(hit, self.ai_y, -1)
+        self.ball_x[hit] = self.width - self.paddle_width - r - 1
+
+        # Scoring
+        ai_point = live & (self.ball_x < 0)
+        player_point = live & ~ai_point & (self.ball_x > self.width)
+        self.ai_score[ai_point] += 1
+        self.player_score[player_point] += 1
+        point = ai_point | player_point
+        if point.any():
+            self.rallies.append(self.hits[point].copy())
+            self.hits[point] = 0
+            self.reset_ball(point)
+            self.done |= (self.ai_score >= self.winning_score) | (self.player_score >= self.winning_score)
+
+    def run(self, max_minutes=MAX_MATCH_MINUTES):
+        for _ in range(int(max_minutes * 60 * TICKS_PER_SECOND)):
+            live = ~self.done
+            if not live.any():
+                break
+            self.move_paddles(live)
+            self.update_ball(live)
+            self.ticks[live] += 1
+            self.step += 1
+        return self.results()
+
+    def results(self):
+        finished = self.done
+        # Points still in play when time ran out count with the hits so far
+        rallies = np.concatenate(self.rallies + [self.hits[~finished]])
+        return {
+            "matches": self.n,
+            "finished": int(finished.sum()),
+            "ai_wins": int((finished & (self.ai_score > self.player_score)).sum()),
+            "points": int((self.ai_score + self.player_score).sum()),
+            "ticks": int(self.ticks.sum()),
+            "hits": int(rallies.sum()),
+            "rallies": len(rallies),
+        }
+
+
+def run_batch(job):
+    difficulty, n, opponent, seed, max_minutes, reaction_ms, aim_error = job
+    batch = MatchBatch(n, difficulty, opponent, seed, reaction_ms=reaction_ms, aim_error=aim_error)
+    return batch.run(max_minutes)
+
+
+def simulate(difficulty, matches, opponent="human", seed=None, workers=None, batch_size=1000,
+             max_minutes=MAX_MATCH_MINUTES, reaction_ms=REACTION_MS, aim_error=AIM_ERROR):
+    # Split the matches into batches and play them on a process pool
+    seeds = np.random.SeedSequence(seed).spawn((matches + batch_size - 1) // batch_size)
+    jobs = []
+    for i, child in enumerate(seeds):
+        n = min(batch_size, matches - i * batch_size)
+        jobs.append((difficulty, n, opponent, child.generate_state(1)[0], max_minutes, reaction_ms, aim_error))
+
+    if workers == 1 or len(jobs) == 1:
+        parts = [run_batch(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(run_batch, jobs))
+
+    total = {key: sum(part[key] for part in parts) for key in parts[0]}
+    minutes = total["ticks"] / TICKS_PER_SECOND / 60
+    return {
+        "difficulty": difficulty,
+        "matches": total["matches"],
+        "unfinished": total["matches"] - total["finished"],
+        "ai_win_rate": total["ai_wins"] / max(1, total["finished"]),
+        # Paddle hits per point, counting each unfinished match's last point
+        "rally_length": total["hits"] / max(1, total["rallies"]),
+        "points_per_minute": total["points"] / minutes if minutes else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate Ping Pong matches to calibrate AI difficulty")
+    parser.add_argument("--matches", type=int, default=2000, help="matches per difficulty")
+    parser.add_argument("--opponent", default="human", help='"human", "tracker" or "ai:Easy|Medium|Hard"')
+    parser.add_argument("--reaction-ms", type=float, default=REACTION_MS, help="human opponent's reaction delay")
+    parser.add_argument("--aim-error", type=int, default=AIM_ERROR, help="human opponent's aim error in pixels")
+    parser.add_argument("--difficulty", action="append", choices=list(AI_SPEED),
+                        help="difficulty to simulate (repeatable, default: all)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--batch-size", type=int, default=1000, help="matches per worker batch")
+    parser.add_argument("--max-minutes", type=float, default=MAX_MATCH_MINUTES,
+                        help="game minutes before a match counts as unfinished")
+    args = parser.parse_args()
+
+    print(f"{'Difficulty':<10} {'Matches':>8} {'Unfinished':>10} {'AI wins':>8} {'Rally':>7} {'Points/min':>11}")
+    for difficulty in args.difficulty or list(AI_SPEED):
+        stats = simulate(difficulty, args.matches, args.opponent, args.seed, args.workers,
+                         args.batch_size, args.max_minutes, args.reaction_ms, args.aim_error)
+        print(f"{difficulty:<10} {stats['matches']:>8} {stats['unfinished']:>10} {stats['ai_win_rate']:>8.1%} "
+              f"{stats['rally_length']:>7.2f} {stats['points_per_minute']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
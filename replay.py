@@ -0,0 +1,200 @@
+import argparse
+import copy
+import json
+import time
+
+from pong_core import PingPongCore
+from snake_core import SnakeCore
+
+# A recording is the seed, the game config and the inputs, never the game
+# state: the cores take every random choice from their seeded RNG, so
+# replaying the inputs tick by tick rebuilds the whole session.
+#
+# File layout: MAGIC, varint header length, JSON header, then one event per
+# input change:
+#     varint(ticks since the previous event << 2 | channel)
+#     varint(zigzag(value - previous value on that channel))
+# A held key costs nothing and a typical change fits in two bytes.
+
+MAGIC = b"RPL1"
+CORES = {"snake": SnakeCore, "pong": PingPongCore}
+CHANNELS = 4
+
+
+def core_class(kind):
+    # The multi-ball core needs NumPy, so it is only imported for its
+    # recordings
+    if kind == "pong_multiball":
+        from pong_multiball import MultiBallCore
+        return MultiBallCore
+    return CORES[kind]
+
+
+def write_varint(out, n):
+    while n > 0x7F:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def read_varint(data, pos):
+    n = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        n |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return n, pos
+        shift += 7
+
+
+def zigzag(n):
+    return n * 2 if n >= 0 else -n * 2 - 1
+
+
+def unzigzag(n):
+    return n >> 1 if not n & 1 else -(n >> 1) - 1
+
+
+class Recording:
+    def __init__(self, kind, seed, config, ticks=0, events=b""):
+        self.kind = kind
+        self.seed = seed
+        self.config = config
+        self.ticks = ticks
+        self.events = bytes(events)
+
+    def decode(self):
+        # List of (tick, channel, value), in order
+        events = []
+        values = [0] * CHANNELS
+        tick = pos = 0
+        while pos < len(self.events):
+            key, pos = read_varint(self.events, pos)
+            delta, pos = read_varint(self.events, pos)
+            tick += key >> 2
+            channel = key & 3
+            values[channel] += unzigzag(delta)
+            events.append((tick, channel, values[channel]))
+        return events
+
+    def save(self, path):
+        header = json.dumps({
+            "kind": self.kind, "seed": self.seed, "config": self.config, "ticks": self.ticks
+        }).encode()
+        out = bytearray(MAGIC)
+        write_varint(out, len(header))
+        with open(path, "wb") as f:
+            f.write(out + header + self.events)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a replay file")
+        size, pos = read_varint(data, len(MAGIC))
+        header = json.loads(data[pos:pos + size])
+        return cls(header["kind"], header["seed"], header["config"], header["ticks"], data[pos + size:])
+
+
+class Recorder:
+    # Collects the inputs of a live game. Call record() for each channel
+    # just before a tick (only changes are stored) and advance() after it.
+    def __init__(self, kind, seed, config):
+        self.kind = kind
+        self.seed = seed
+        self.config = config
+        self.ticks = 0
+        self.events = bytearray()
+        self.values = [None] * CHANNELS
+        self.last_tick = 0
+
+    def record(self, channel, value, force=False):
+        previous = self.values[channel]
+        if value == previous and not force:
+            return
+        write_varint(self.events, (self.ticks - self.last_tick) << 2 | channel)
+        write_varint(self.events, zigzag(value - (previous or 0)))
+        self.values[channel] = value
+        self.last_tick = self.ticks
+
+    def advance(self):
+        self.ticks += 1
+
+    def finish(self):
+        return Recording(self.kind, self.seed, self.config, self.ticks, self.events)
+
+
+class Player:
+    # Re-simulates a recording headless, as fast as the rules run. A copy of
+    # the game is kept every keyframe_interval ticks, so seek() only has to
+    # simulate forward from the nearest one.
+    def __init__(self, recording, keyframe_interval=1000):
+        self.recording = recording
+        self.events = recording.decode()
+        self.keyframe_interval = keyframe_interval
+        self.game = core_class(recording.kind)(recording.seed, **recording.config)
+        self.tick = 0
+        self.next_event = 0
+        self.keyframes = {0: (copy.deepcopy(self.game), 0)}
+
+    def apply_inputs(self):
+        events = self.events
+        while self.next_event < len(events) and events[self.next_event][0] == self.tick:
+            _, channel, value = events[self.next_event]
+            self.game.apply_input(channel, value)
+            self.next_event += 1
+
+    def step(self):
+        self.apply_inputs()
+        self.game.tick()
+        self.tick += 1
+        if self.tick % self.keyframe_interval == 0 and self.tick not in self.keyframes:
+            self.keyframes[self.tick] = (copy.deepcopy(self.game), self.next_event)
+
+    def seek(self, tick):
+        # Jump to the state just before the given tick is simulated
+        tick = max(0, min(tick, self.recording.ticks))
+        start = max(t for t in self.keyframes if t <= tick)
+        if tick < self.tick or start > self.tick:
+            game, self.next_event = self.keyframes[start]
+            self.game = copy.deepcopy(game)
+            self.tick = start
+        while self.tick < tick:
+            self.step()
+        return self.game
+
+    def play_to_end(self):
+        self.seek(self.recording.ticks)
+        # Inputs recorded after the last tick (e.g. a final reset)
+        self.apply_inputs()
+        return self.game
+
+
+def summary(game):
+    if isinstance(game, SnakeCore):
+        return f"score {game.score}, length {len(game.snake)}, game over: {game.is_game_over}"
+    return f"score {game.player_score} - {game.ai_score}, game over: {game.is_game_over}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded Snake or Ping Pong session headless")
+    parser.add_argument("path", help="recording saved with GAME_RECORD=<path>")
+    parser.add_argument("--tick", type=int, help="stop at this tick instead of the end")
+    parser.add_argument("--keyframes", type=int, default=1000, help="ticks between keyframes")
+    args = parser.parse_args()
+
+    recording = Recording.load(args.path)
+    print(f"{recording.kind} recording: seed {recording.seed}, {recording.ticks} ticks, "
+          f"{len(recording.events)} bytes of input")
+    player = Player(recording, args.keyframes)
+    start = time.perf_counter()
+    game = player.seek(args.tick) if args.tick is not None else player.play_to_end()
+    elapsed = time.perf_counter() - start
+    print(f"tick {player.tick}: {summary(game)}")
+    print(f"replayed in {elapsed:.3f}s ({player.tick / max(elapsed, 1e-9):.0f} ticks/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,179 +1,353 @@
-import tkinter as tk
-import random
+import os
+from collections import deque
 
-class SnakeGame:
-    def __init__(self, master):
+from frame_profiler import FrameProfiler
+from game_input import Keyboard
+from replay import Recorder
+from snake_autopilot import Autopilot
+from snake_core import DIRECTION, DIRECTIONS, SnakeCore
+from snake_snapshot import SnapshotRing, board_config, load, save
+
+try:
+    import tkinter as tk
+except ImportError:  # headless: the rules are in snake_core and still import
+    tk = None
+
+class SnakeRenderer:
+    # Retained-mode drawing for SnakeGame. Canvas items are created once and
+    # then moved or recoloured: each tick the old tail rectangle becomes the
+    # new head, so a frame costs a few canvas calls however long the snake
+    # is. The border and obstacles are static items.
+    def __init__(self, game):
+        self.game = game
+        self.canvas = game.canvas
+        self.reset()
+    
+    def reset(self):
+        # Forget every item; the next draw() builds the scene again
+        self.canvas.delete("all")
+        self.segments = deque()
+        self.head = None
+        self.food_item = None
+        self.food = None
+        self.obstacle_items = []
+        self.score_item = None
+        self.score = None
+    
+    def cell_coords(self, position):
+        x, y = position
+        return x, y, x + self.game.cell_size, y + self.game.cell_size
+    
+    def draw(self):
+        if self.score_item is None:
+            # Draw walls (border) once
+            self.canvas.create_rectangle(
+                0, 0, self.game.width, self.game.height, 
+                outline="gray", width=2
+            )
+            self.score_item = self.canvas.create_text(
+                50, 20, text="", 
+                fill="white", font=("Arial", 14)
+            )
+        
+        self.draw_snake()
+        self.draw_food()
+        self.draw_obstacles()
+        
+        if self.game.score != self.score:
+            self.score = self.game.score
+            self.canvas.itemconfig(self.score_item, text=f"Score: {self.score}")
+    
+    def draw_snake(self):
+        snake = self.game.snake
+        if snake[0] == self.head:
+            return
+        
+        grown = len(snake) - len(self.segments)
+        if len(snake) > 1 and snake[1] == self.head and grown in (0, 1):
+            # Snake moved one cell: old head becomes body, and either a new
+            # head is added (it ate) or the tail item is moved to the front
+            self.canvas.itemconfig(self.segments[0], fill="green")
+            if grown:
+                item = self.canvas.create_rectangle(
+                    *self.cell_coords(snake[0]), 
+                    fill="green3", outline="black"
+                )
+                self.canvas.tag_raise(self.score_item)
+            else:
+                item = self.segments.pop()
+                self.canvas.coords(item, *self.cell_coords(snake[0]))
+                self.canvas.itemconfig(item, fill="green3")
+            self.segments.appendleft(item)
+        else:
+            # Snake was replaced (restart or loaded state): draw it again
+            for item in self.segments:
+                self.canvas.delete(item)
+            self.segments = deque(
+                self.canvas.create_rectangle(
+                    *self.cell_coords(position), 
+                    fill="green3" if i == 0 else "green", outline="black"
+                )
+                for i, position in enumerate(snake)
+            )
+            self.canvas.tag_raise(self.score_item)
+        self.head = snake[0]
+    
+    def draw_food(self):
+        food = self.game.food
+        if food == self.food:
+            return
+        self.food = food
+        if food is None:
+            if self.food_item is not None:
+                self.canvas.delete(self.food_item)
+                self.food_item = None
+        elif self.food_item is None:
+            self.food_item = self.canvas.create_oval(
+                *self.cell_coords(food), 
+                fill="red", outline="white"
+            )
+        else:
+            self.canvas.coords(self.food_item, *self.cell_coords(food))
+    
+    def draw_obstacles(self):
+        # Obstacles never move, so only new ones need items
+        for position in self.game.obstacles[len(self.obstacle_items):]:
+            self.obstacle_items.append(self.canvas.create_rectangle(
+                *self.cell_coords(position), 
+                fill="gray", outline="white"
+            ))
+            self.canvas.tag_raise(self.score_item)
+
+class BitmapRenderer:
+    # Drawing for boards too big for one canvas item per cell. The board is
+    # one PhotoImage and self.cells holds the colour code last painted into
+    # each cell; a cell is only repainted when its code changes, as one
+    # put() filling its cell_size square. A frame touches the few cells
+    # around the head, tail and food, whatever the snake length or the
+    # number of obstacles.
+    EMPTY, BODY, HEAD, FOOD, OBSTACLE = range(5)
+    COLORS = ("#000000", "#00ff00", "#00cd00", "#ff0000", "#808080")
+    
+    def __init__(self, game):
+        self.game = game
+        self.canvas = game.canvas
+        self.reset()
+    
+    def reset(self):
+        # Forget the image; the next draw() builds the scene again
+        self.canvas.delete("all")
+        self.image = None
+        self.cells = None
+        self.head = None
+        self.tail = None
+        self.length = 0
+        self.food = None
+        self.obstacle_count = 0
+        self.score_item = None
+        self.score = None
+    
+    def paint(self, position, code):
+        index = self.game.cell_index(position)
+        if index is None or self.cells[index] == code:
+            return
+        self.cells[index] = code
+        x, y = position
+        size = self.game.cell_size
+        self.image.put(self.COLORS[code], to=(x, y, x + size, y + size))
+    
+    def draw(self):
+        if self.image is None:
+            game = self.game
+            self.image = tk.PhotoImage(master=game.master, width=game.width, height=game.height)
+            self.image.put(self.COLORS[self.EMPTY], to=(0, 0, game.width, game.height))
+            self.cells = bytearray(game.cols * game.rows)
+            self.canvas.create_image(0, 0, image=self.image, anchor="nw")
+            self.canvas.create_rectangle(
+                0, 0, game.width, game.height, 
+                outline="gray", width=2
+            )
+            self.score_item = self.canvas.create_text(
+                50, 20, text="", 
+                fill="white", font=("Arial", 14)
+            )
+        
+        # The old food cell may be under the new head, so clear it first
+        if self.game.food != self.food and self.food is not None:
+            self.paint(self.food, self.EMPTY)
+        self.draw_snake()
+        if self.game.food != self.food:
+            self.food = self.game.food
+            if self.food is not None:
+                self.paint(self.food, self.FOOD)
+        for position in self.game.obstacles[self.obstacle_count:]:
+            self.paint(position, self.OBSTACLE)
+        self.obstacle_count = len(self.game.obstacles)
+        
+        if self.game.score != self.score:
+            self.score = self.game.score
+            self.canvas.itemconfig(self.score_item, text=f"Score: {self.score}")
+    
+    def draw_snake(self):
+        snake = self.game.snake
+        if snake[0] == self.head:
+            return
+        
+        grown = len(snake) - self.length
+        if len(snake) > 1 and snake[1] == self.head and grown in (0, 1):
+            # Snake moved one cell: clear the old tail unless it is still
+            # covered, then the old head becomes body
+            if not grown:
+                index = self.game.cell_index(self.tail)
+                if index is not None and self.game.grid[index] == 0:
+                    self.paint(self.tail, self.EMPTY)
+            self.paint(self.head, self.BODY)
+        else:
+            # Snake was replaced (restart or loaded state): start from a
+            # blank board
+            self.image.put(self.COLORS[self.EMPTY], to=(0, 0, self.game.width, self.game.height))
+            self.cells = bytearray(len(self.cells))
+            self.food = None
+            self.obstacle_count = 0
+            for position in snake:
+                self.paint(position, self.BODY)
+        self.paint(snake[0], self.HEAD)
+        self.head = snake[0]
+        self.tail = snake[-1]
+        self.length = len(snake)
+
+class SnakeGame(SnakeCore):
+    # The rules live in SnakeCore; this class draws the game and reads keys.
+    # Boards of BITMAP_CELLS cells or more are drawn by BitmapRenderer.
+    BITMAP_CELLS = 10000
+    
+    def __init__(self, master, width=600, height=400, cell_size=20):
         self.master = master
         self.master.title("Snake Game")
         self.master.resizable(False, False)
         
-        # Game settings
-        self.width = 600
-        self.height = 400
-        self.cell_size = 20
-        self.delay = 100  # milliseconds
-        
-        # Game state
-        self.snake = [(100, 100), (80, 100), (60, 100)]
-        self.direction = "Right"
-        self.score = 0
-        self.obstacles = []
-        self.is_game_over = False
+        # Game settings and state, with the first food already placed
+        SnakeCore.__init__(self, width=width, height=height, cell_size=cell_size)
         
         # Create canvas
         self.canvas = tk.Canvas(master, width=self.width, height=self.height, bg="black", highlightthickness=0)
         self.canvas.pack(padx=10, pady=10)
+        if self.cols * self.rows >= self.BITMAP_CELLS:
+            self.renderer = BitmapRenderer(self)
+        else:
+            self.renderer = SnakeRenderer(self)
+        
+        # Frame profiler, off until toggled with F3
+        self.profiler = FrameProfiler(("input", "movement", "collisions", "draw"), self.delay)
+        
+        # Inputs of the current game, see replay.py
+        self.recorder = Recorder("snake", self.seed, self.config())
+        
+        # Arrow keys are queued and applied one turn per tick, see take_turn
+        self.keyboard = Keyboard(self.master, DIRECTIONS)
+        self.master.bind("<F3>", self.toggle_profiler)
         
-        # Place initial food
-        self.food = self.create_food()
+        # Autopilot, off until toggled with F2
+        self.autopilot = None
+        self.master.bind("<F2>", self.toggle_autopilot)
         
-        # Bind arrow keys
-        self.master.bind("<Left>", lambda e: self.change_direction("Left"))
-        self.master.bind("<Right>", lambda e: self.change_direction("Right"))
-        self.master.bind("<Up>", lambda e: self.change_direction("Up"))
-        self.master.bind("<Down>", lambda e: self.change_direction("Down"))
+        # A snapshot every second for undo: Backspace goes back to the last
+        # one, and further with each press. Snapshots grow with the snake,
+        # which can get very long on big boards, so those have no undo.
+        self.history = SnapshotRing(30) if self.cols * self.rows < self.BITMAP_CELLS else None
+        self.snapshot_countdown = 0
+        self.master.bind("<BackSpace>", self.undo)
+        
+        # GAME_PROFILE=<file.csv> starts with the profiler on. close() saves
+        # the recorded frames and, with GAME_RECORD=<file>, the inputs for
+        # replay.py; it runs when the window goes away, whether this script
+        # or launcher.py opened it.
+        self.closed = False
+        self.master.bind("<Destroy>", self.destroyed, add="+")
+        if os.environ.get("GAME_PROFILE"):
+            self.toggle_profiler()
         
         # Start game
+        self.after_id = None
         self.update()
     
-    def change_direction(self, new_direction):
-        # Prevent 180-degree turns
-        opposites = {"Left": "Right", "Right": "Left", "Up": "Down", "Down": "Up"}
-        if new_direction != opposites.get(self.direction):
-            self.direction = new_direction
+    def toggle_profiler(self, event=None):
+        # Turn frame timing and its on-canvas overlay on or off
+        enabled = not self.profiler.enabled
+        self.profiler.set_enabled(enabled)
+        self.profiler.show_overlay(self.canvas if enabled else None, self.width)
     
-    def create_food(self):
-        # Place food in a random position
-        while True:
-            x = random.randint(1, (self.width // self.cell_size) - 2) * self.cell_size
-            y = random.randint(1, (self.height // self.cell_size) - 2) * self.cell_size
-            food_position = (x, y)
-            
-            # Make sure food is not on snake or obstacles
-            if food_position not in self.snake and food_position not in self.obstacles:
-                return food_position
-    
-    def create_obstacle(self):
-        # Create a new obstacle when score increases
-        attempts = 0
-        max_attempts = 50
-        
-        while attempts < max_attempts:
-            x = random.randint(1, (self.width // self.cell_size) - 2) * self.cell_size
-            y = random.randint(1, (self.height // self.cell_size) - 2) * self.cell_size
-            position = (x, y)
-            
-            # Make sure obstacle doesn't overlap with anything
-            if position not in self.snake and position != self.food and position not in self.obstacles:
-                self.obstacles.append(position)
-                return
-            
-            attempts += 1
-    
-    def move_snake(self):
-        # Get current head position
-        head_x, head_y = self.snake[0]
-        
-        # Calculate new head position based on direction
-        if self.direction == "Left":
-            new_head = (head_x - self.cell_size, head_y)
-        elif self.direction == "Right":
-            new_head = (head_x + self.cell_size, head_y)
-        elif self.direction == "Up":
-            new_head = (head_x, head_y - self.cell_size)
-        elif self.direction == "Down":
-            new_head = (head_x, head_y + self.cell_size)
-        
-        # Add new head to snake
-        self.snake.insert(0, new_head)
-        
-        # Check for food collision
-        if new_head == self.food:
-            # Snake grows, don't remove tail
-            self.score += 1
-            self.food = self.create_food()
-            
-            # Create obstacle every 2 points after score 10
-            if self.score >= 10 and (self.score - 10) % 2 == 0:
-                self.create_obstacle()
-        else:
-            # Remove tail if no food eaten
-            self.snake.pop()
+    def stop(self):
+        # Cancel the next scheduled tick, e.g. before the window goes away
+        if self.after_id is not None:
+            self.master.after_cancel(self.after_id)
+            self.after_id = None
     
-    def check_collisions(self):
-        # Get head position
-        head_x, head_y = self.snake[0]
-        
-        # Check for wall collisions
-        if (head_x < 0 or head_x >= self.width or 
-            head_y < 0 or head_y >= self.height):
-            return True
-        
-        # Check for self-collision (skip head)
-        if self.snake[0] in self.snake[1:]:
-            return True
+    def close(self):
+        # Stop for good and save the profile and recording
+        if self.closed:
+            return
+        self.closed = True
+        self.stop()
+        if self.profiler.frames:
+            self.profiler.dump_csv(os.environ.get("GAME_PROFILE") or "snake_frames.csv")
+        record_path = os.environ.get("GAME_RECORD")
+        if record_path and self.recorder is not None:
+            self.recorder.finish().save(record_path)
+    
+    def destroyed(self, event):
+        # <Destroy> also fires for each child widget; only the window counts
+        if event.widget is self.master:
+            self.close()
+    
+    def undo(self, event=None):
+        if self.history is None:
+            return
+        data = self.history.back(1)
+        if data is None:
+            return
+        self.stop()
+        self.restore(data)
+        self.snapshot_countdown = 1000 // self.delay
+        self.keyboard.clear()
+        self.profiler.skip()
         
-        # Check for obstacle collision
-        if self.snake[0] in self.obstacles:
-            return True
+        # Give the player a tick to see where they are
+        self.after_id = self.master.after(self.delay, self.update)
+    
+    def toggle_autopilot(self, event=None):
+        # Let the game play itself, or hand it back to the arrow keys
+        self.autopilot = Autopilot(self) if self.autopilot is None else None
+    
+    def take_turn(self):
+        if self.autopilot is not None:
+            self.keyboard.clear()
+            self.autopilot.steer()
+            return
         
-        return False
+        # Apply the first queued key press that is a real turn; later
+        # presses wait for the next ticks instead of overwriting it
+        while True:
+            key = self.keyboard.next_press()
+            if key is None or self.change_direction(key):
+                return
     
     def draw_objects(self):
-        # Clear canvas
-        self.canvas.delete("all")
-        
-        # Draw walls (border)
-        self.canvas.create_rectangle(
-            0, 0, self.width, self.height, 
-            outline="gray", width=2
-        )
-        
-        # Draw snake
-        for i, (x, y) in enumerate(self.snake):
-            # Head has different color
-            if i == 0:
-                self.canvas.create_rectangle(
-                    x, y, x + self.cell_size, y + self.cell_size, 
-                    fill="green3", outline="black"
-                )
-            else:
-                self.canvas.create_rectangle(
-                    x, y, x + self.cell_size, y + self.cell_size, 
-                    fill="green", outline="black"
-                )
-        
-        # Draw food
-        x, y = self.food
-        self.canvas.create_oval(
-            x, y, x + self.cell_size, y + self.cell_size, 
-            fill="red", outline="white"
-        )
-        
-        # Draw obstacles
-        for x, y in self.obstacles:
-            self.canvas.create_rectangle(
-                x, y, x + self.cell_size, y + self.cell_size, 
-                fill="gray", outline="white"
-            )
-        
-        # Draw score
-        self.canvas.create_text(
-            50, 20, text=f"Score: {self.score}", 
-            fill="white", font=("Arial", 14)
-        )
+        # Only changed items are touched, see SnakeRenderer
+        self.renderer.draw()
     
     def show_game_over(self):
         # Clear canvas and show game over screen
-        self.canvas.delete("all")
+        self.renderer.reset()
         
         # Background
         self.canvas.create_rectangle(0, 0, self.width, self.height, fill="black")
         
-        # Game Over text
+        # Game Over text (no food left means the snake filled the board)
         self.canvas.create_text(
             self.width // 2, self.height // 2 - 50,
-            text="GAME OVER", fill="white", font=("Arial", 36, "bold")
+            text="GAME OVER" if self.food is not None else "BOARD FULL",
+            fill="white", font=("Arial", 36, "bold")
         )
         
         # Show score
@@ -212,39 +386,165 @@ class SnakeGame:
         )
     
     def restart_game(self):
-        # Reset game state
-        self.snake = [(100, 100), (80, 100), (60, 100)]
-        self.direction = "Right"
-        self.score = 0
-        self.obstacles = []
-        self.is_game_over = False
-        self.food = self.create_food()
+        # Reset game state with a fresh seed
+        self.reset()
+        self.recorder = Recorder("snake", self.seed, self.config())
+        if self.history is not None:
+            self.history.clear()
+            self.snapshot_countdown = 0
+        
+        # Clear the game over screen and drop keys pressed meanwhile
+        self.keyboard.clear()
+        self.renderer.reset()
+        self.profiler.skip()
         
         # Restart game loop
         self.update()
     
+    def load_state(self, state):
+        # Show a game from elsewhere, e.g. SnakeEngine.lane_state(i). It did
+        # not start from our seed, so it can't be recorded.
+        SnakeCore.load_state(self, state)
+        self.recorder = None
+        self.renderer.reset()
+        self.draw_objects()
+    
+    def restore(self, data):
+        # Show a snapshot (undo or a saved game). Recordings start from a
+        # fresh game, so this one can't be recorded any more.
+        SnakeCore.restore(self, data)
+        self.recorder = None
+        self.renderer.reset()
+        self.draw_objects()
+    
     def update(self):
         if not self.is_game_over:
+            profiler = self.profiler
+            profiler.begin()
+            if self.history is not None:
+                if self.snapshot_countdown == 0:
+                    self.history.push(self.snapshot())
+                    self.snapshot_countdown = 1000 // self.delay
+                self.snapshot_countdown -= 1
+            self.take_turn()
+            if self.recorder is not None:
+                self.recorder.record(DIRECTION, DIRECTIONS.index(self.direction))
+                self.recorder.advance()
+            profiler.mark("input")
+            
             # Move snake
             self.move_snake()
+            profiler.mark("movement")
             
             # Check for collisions
-            if self.check_collisions():
+            collided = self.check_collisions() or self.food is None
+            profiler.mark("collisions")
+            if collided:
                 self.is_game_over = True
                 self.show_game_over()
+                profiler.end()
                 return  # Stop the game loop
             
             # Draw everything
             self.draw_objects()
+            profiler.mark("draw")
+            profiler.end()
             
             # Schedule next update
-            self.master.after(self.delay, self.update)
+            self.after_id = self.master.after(self.delay, self.update)
         else:
             # If game is over, just show game over screen
             self.show_game_over()
 
+class RemoteSnakeGame(SnakeGame):
+    # Plays a session hosted by snake_server.py: turns are sent to the
+    # server, and the board mirrors the ticks it sends back
+    poll_ms = 10
+    
+    def __init__(self, master, connection):
+        self.connection = connection
+        self.over_shown = False
+        SnakeGame.__init__(self, master, **connection.config)
+        self.recorder = None  # the server owns the game's randomness
+        self.history = None  # and its state, so there is no undo
+    
+    def change_direction(self, new_direction):
+        # The server checks and applies turns, one per tick
+        self.connection.send_turn(new_direction)
+        return True
+    
+    def restart_game(self):
+        # The server answers with a fresh game, see update
+        self.connection.send_restart()
+        self.keyboard.clear()
+    
+    def load_state(self, state):
+        SnakeGame.load_state(self, state)
+        self.over_shown = False
+    
+    def update(self):
+        # Keys go out as soon as they are pressed; the autopilot plans once
+        # per tick received
+        if self.autopilot is None:
+            self.take_turn()
+        try:
+            ticks = self.connection.receive(self)
+        except ConnectionError:
+            self.master.destroy()
+            return
+        if ticks:
+            if self.is_game_over:
+                if not self.over_shown:
+                    self.over_shown = True
+                    self.show_game_over()
+            else:
+                if self.autopilot is not None:
+                    self.autopilot.steer()
+                self.draw_objects()
+        self.after_id = self.master.after(self.poll_ms, self.update)
+
 # Run the game
 if __name__ == "__main__":
     root = tk.Tk()
-    game = SnakeGame(root)
+    
+    # SNAKE_SERVER=<host:port or socket path> plays on a snake_server.py
+    # session instead of a local game
+    server = os.environ.get("SNAKE_SERVER")
+    
+    # SNAKE_BOARD=<cols>x<rows> plays on a bigger board, with cells shrunk
+    # to keep the window about 1000 pixels across at most
+    board = os.environ.get("SNAKE_BOARD")
+    
+    # SNAKE_STATE=<file> resumes the game saved there and saves it again
+    # on exit
+    state_path = os.environ.get("SNAKE_STATE")
+    game = None
+    if state_path and os.path.exists(state_path):
+        try:
+            with open(state_path, "rb") as f:
+                config = board_config(f.read(64))
+            game = SnakeGame(root, config["width"], config["height"], config["cell_size"])
+            load(state_path, game)
+        except ValueError as error:
+            # Damaged, or from an older snapshot format; restore() changes
+            # nothing on failure, so the game starts fresh
+            print(f"{state_path}: {error}, starting a new game")
+    if game is None:
+        if server:
+            from snake_server import Connection
+            game = RemoteSnakeGame(root, Connection(server))
+        elif board:
+            cols, rows = (int(n) for n in board.lower().split("x"))
+            cell_size = max(1, min(20, 1000 // max(cols, rows)))
+            game = SnakeGame(root, cols * cell_size, rows * cell_size, cell_size)
+        else:
+            game = SnakeGame(root)
+    
+    # The profile and recording are saved by game.close()
     root.mainloop()
+    
+    # A finished game is not kept: the next launch starts a new one
+    if state_path and not game.is_game_over:
+        save(state_path, game)
+    elif state_path and os.path.exists(state_path):
+        os.remove(state_path)
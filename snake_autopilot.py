@@ -0,0 +1,236 @@
+import argparse
+import time
+from array import array
+from heapq import heappop, heappush
+
+from snake_core import SnakeCore
+from snake_snapshot import load
+
+
+class Autopilot:
+    """Plays a SnakeCore (or SnakeGame) through change_direction.
+
+    The path to the food comes from an A* search over the occupancy grid
+    and is cached: while the food stays put and the next cell is free the
+    snake just follows it, so a search runs about once per food instead of
+    once per tick. A path is only taken if, after eating, the snake could
+    still reach its own tail; otherwise it stalls, keeping the tail in
+    reach, until a safe path opens up. After a whole board's worth of
+    stalled ticks it takes the risky path anyway rather than circle
+    forever. Planning time per move is kept in a ring of the last `size`
+    moves.
+    """
+
+    def __init__(self, game, size=4096):
+        self.game = game
+        self.path = []  # cells still to visit, next one last
+        self.food = None
+        self.obstacles = None
+        self.obstacle_cells = set()
+        self.stalled = 0  # ticks since the last safe path to the food
+
+        self.size = size
+        self.times = array("q", [0]) * size
+        self.moves = 0
+        self.searches = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def steer(self):
+        start = time.perf_counter_ns()
+        direction = self.plan()
+        if direction is not None:
+            self.game.change_direction(direction)
+        elapsed = time.perf_counter_ns() - start
+        self.times[self.moves % self.size] = elapsed
+        self.moves += 1
+        self.total_ns += elapsed
+        self.max_ns = max(self.max_ns, elapsed)
+
+    # Grid helpers, all on cell indices
+
+    def neighbours(self, cell):
+        cols = self.game.cols
+        x = cell % cols
+        if x > 0:
+            yield cell - 1
+        if x < cols - 1:
+            yield cell + 1
+        if cell >= cols:
+            yield cell - cols
+        if cell + cols < len(self.game.grid):
+            yield cell + cols
+
+    def direction(self, cell, target):
+        step = target - cell
+        if step == 1:
+            return "Right"
+        if step == -1:
+            return "Left"
+        return "Down" if step > 0 else "Up"
+
+    def search(self, start, goal, blocked):
+        # A* with the Manhattan distance; returns the cells after start up
+        # to goal, goal first, or None if blocked off
+        cols = self.game.cols
+        gx, gy = goal % cols, goal // cols
+        came_from = {start: None}
+        cost = {start: 0}
+        heap = [(abs(start % cols - gx) + abs(start // cols - gy), 0, start)]
+        self.searches += 1
+        while heap:
+            _, g, cell = heappop(heap)
+            g = -g
+            if cell == goal:
+                path = []
+                while cell != start:
+                    path.append(cell)
+                    cell = came_from[cell]
+                return path
+            if g > cost[cell]:
+                continue
+            g += 1
+            for nxt in self.neighbours(cell):
+                if nxt != goal and blocked(nxt):
+                    continue
+                if g < cost.get(nxt, g + 1):
+                    cost[nxt] = g
+                    came_from[nxt] = cell
+                    # Ties go to the deeper node, so open boards don't
+                    # expand a whole diamond of equal-cost cells
+                    heappush(heap, (g + abs(nxt % cols - gx) + abs(nxt // cols - gy), -g, nxt))
+        return None
+
+    def sync_obstacles(self):
+        obstacles = self.game.obstacles
+        if obstacles is not self.obstacles:
+            self.obstacles = obstacles
+            self.obstacle_cells = set()
+        for position in obstacles[len(self.obstacle_cells):]:
+            self.obstacle_cells.add(self.game.cell_index(position))
+
+    def plan(self):
+        game = self.game
+        if game.food is None:
+            return None
+        grid = game.grid
+        head = game.cell_index(game.snake[0])
+        tail = game.cell_index(game.snake[-1])
+        if head is None:
+            return None
+
+        # Keep following the cached path while it is still good
+        if self.path and game.food == self.food:
+            nxt = self.path[-1]
+            if (grid[nxt] == 0 or nxt == tail) and nxt in self.neighbours(head):
+                self.path.pop()
+                return self.direction(head, nxt)
+
+        self.path = []
+        self.food = game.food
+        self.sync_obstacles()
+        food = game.cell_index(game.food)
+        path = self.search(head, food, lambda cell: grid[cell] and cell != tail)
+        if path is not None:
+            self.stalled += 1
+            if self.tail_reachable(path, self.body()) is not None or self.stalled > len(grid):
+                self.stalled = 0
+                self.path = path
+                return self.direction(head, self.path.pop())
+        return self.escape(head, tail)
+
+    def body(self):
+        return [self.game.cell_index(position) for position in self.game.snake]
+
+    def tail_reachable(self, path, body):
+        # Would the snake, having followed path (goal first), still have a
+        # way to its tail? Then this move can't trap it.
+        grows = path[0] == self.game.cell_index(self.game.food)
+        virtual = (path + body)[:len(body) + grows]
+        occupied = set(virtual)
+        obstacles = self.obstacle_cells
+        return self.search(
+            virtual[0], virtual[-1],
+            lambda cell: cell in occupied or cell in obstacles
+        )
+
+    def escape(self, head, tail):
+        # No safe way to the food: of the moves that keep the tail
+        # reachable, take the one furthest from it. That unwinds the body
+        # and opens up space, where always chasing the tail would circle
+        # forever. With no such move, take the one with most room.
+        grid = self.game.grid
+        body = self.body()
+        best, distance = None, -1
+        for cell in self.neighbours(head):
+            if grid[cell] == 0 or cell == tail:
+                path = self.tail_reachable([cell], body)
+                if path is not None and len(path) > distance:
+                    best, distance = cell, len(path)
+        if best is None:
+            room = -1
+            for cell in self.neighbours(head):
+                if grid[cell] == 0 or cell == tail:
+                    space = self.room(cell, len(body))
+                    if space > room:
+                        best, room = cell, space
+        return self.direction(head, best) if best is not None else None
+
+    def room(self, start, enough):
+        # Free cells reachable from start, counting no further than enough
+        grid = self.game.grid
+        seen = {start}
+        stack = [start]
+        while stack and len(seen) < enough:
+            for cell in self.neighbours(stack.pop()):
+                if cell not in seen and grid[cell] == 0:
+                    seen.add(cell)
+                    stack.append(cell)
+        return len(seen)
+
+    def summary(self):
+        # Planning time per move in milliseconds over the recent ring
+        count = min(self.moves, self.size)
+        if not count:
+            return None
+        recent = sorted(self.times[:count])
+        return {
+            "moves": self.moves,
+            "searches": self.searches,
+            "mean_ms": self.total_ns / self.moves / 1e6,
+            "p99_ms": recent[min(count - 1, count * 99 // 100)] / 1e6,
+            "max_ms": self.max_ns / 1e6,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Let the autopilot play Snake headless (soak test)")
+    parser.add_argument("--cols", type=int, default=30)
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--games", type=int, default=5)
+    parser.add_argument("--ticks", type=int, default=100000, help="most ticks per game")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--state", metavar="FILE", help="start every game from this snapshot (see snake_snapshot.py)")
+    args = parser.parse_args()
+
+    cell = 20
+    for n in range(args.games):
+        if args.state:
+            game = load(args.state)
+            game.rng.seed(args.seed + n)  # same start, different food from here on
+        else:
+            game = SnakeCore(args.seed + n, width=args.cols * cell, height=args.rows * cell, cell_size=cell)
+        pilot = Autopilot(game)
+        ticks = 0
+        while not game.is_game_over and ticks < args.ticks:
+            pilot.steer()
+            game.tick()
+            ticks += 1
+        stats = pilot.summary()
+        print(f"game {n}: score {game.score} in {ticks} ticks, {stats['searches']} searches, "
+              f"planning mean {stats['mean_ms']:.3f} ms, p99 {stats['p99_ms']:.3f} ms, "
+              f"max {stats['max_ms']:.3f} ms (budget {game.delay} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+import random
+import struct
+from array import array
+from collections import deque
+from itertools import islice, repeat
+
+# Input channels and direction codes used by recordings (see replay.py)
+DIRECTION = 0
+DIRECTIONS = ("Left", "Right", "Up", "Down")
+
+# Snapshot layout (see SnakeCore.snapshot): the header, then as cell
+# indexes the body after the head (the head is in the header, in pixels,
+# since it may be off the board) and the obstacles, then the 625 words of
+# the Mersenne Twister state. Cells are u16 on boards of up to 65536
+# cells, else u32. Arrays are in native byte order. The occupancy grid and
+# free cells are not stored: restore() rebuilds them from the body,
+# obstacles and food, so a snapshot grows with the snake, not the board.
+SNAPSHOT_MAGIC = b"SNS3"
+SNAPSHOT_HEADER = struct.Struct("<4sHHHHIBBIiiIIId")
+GAME_OVER, GAUSS = 1, 2  # snapshot flags
+NO_CELL = 0xFFFFFFFF
+MT_WORDS = 625
+
+# Seeds go into snapshots and the Snake server's START message as u32
+MAX_SEED = 2 ** 32 - 1
+
+
+class FreeCells:
+    # Set of free board cells with O(1) add, remove and membership test.
+    # cells lists the free cells in no particular order and position[c]
+    # is the slot of cell c in cells, or -1 if c is not free.
+    def __init__(self, size):
+        self.cells = array("i")
+        self.position = array("i", [-1]) * size
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, cell):
+        return self.position[cell] >= 0
+
+    def add(self, cell):
+        if self.position[cell] < 0:
+            self.position[cell] = len(self.cells)
+            self.cells.append(cell)
+
+    def remove(self, cell):
+        # Swap the last free cell into the removed cell's slot
+        slot = self.position[cell]
+        if slot >= 0:
+            last = self.cells.pop()
+            if last != cell:
+                self.cells[slot] = last
+                self.position[last] = slot
+            self.position[cell] = -1
+
+    def copy(self):
+        other = FreeCells(0)
+        other.cells = self.cells[:]
+        other.position = self.position[:]
+        return other
+
+
+class SnakeCore:
+    # Snake rules without any drawing. SnakeGame adds the tkinter window on
+    # top; replays and other headless tools use this class directly.
+    def __init__(self, seed=None, width=600, height=400, cell_size=20, delay=100):
+        # Game settings
+        self.width = width
+        self.height = height
+        self.cell_size = cell_size
+        self.delay = delay  # milliseconds
+        self.cols = self.width // self.cell_size
+        self.rows = self.height // self.cell_size
+        self.position_table = None
+        self.interior_table = None
+
+        # Game state
+        self.rng = random.Random()
+        self.reset(seed)
+
+    def config(self):
+        return {"width": self.width, "height": self.height, "cell_size": self.cell_size, "delay": self.delay}
+
+    def reset(self, seed=None):
+        # Start a new game. Every random choice comes from self.rng, so the
+        # seed and the inputs are enough to replay it.
+        if seed is None:
+            seed = random.randrange(MAX_SEED + 1)
+        elif not isinstance(seed, int) or not 0 <= seed <= MAX_SEED:
+            raise ValueError(f"seed must be an int from 0 to {MAX_SEED}, not {seed!r}")
+        self.seed = seed
+        self.rng.seed(self.seed)
+        cs = self.cell_size
+        self.set_board([(5 * cs, 5 * cs), (4 * cs, 5 * cs), (3 * cs, 5 * cs)], [])
+        self.direction = "Right"
+        self.score = 0
+        self.is_game_over = False
+        self.food = self.create_food()
+
+    def change_direction(self, new_direction):
+        # Prevent 180-degree turns; returns whether the direction changed
+        opposites = {"Left": "Right", "Right": "Left", "Up": "Down", "Down": "Up"}
+        if new_direction in (self.direction, opposites.get(self.direction)):
+            return False
+        self.direction = new_direction
+        return True
+
+    def cell_index(self, position):
+        # Grid index of a pixel position, or None if it is off the board
+        x, y = position
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return (y // self.cell_size) * self.cols + x // self.cell_size
+        return None
+
+    def cell_position(self, index):
+        return (index % self.cols) * self.cell_size, (index // self.cols) * self.cell_size
+
+    def is_interior(self, index):
+        # Food and obstacles are never placed on the outer ring of cells
+        x, y = index % self.cols, index // self.cols
+        return 0 < x < self.cols - 1 and 0 < y < self.rows - 1
+
+    def occupy(self, position):
+        index = self.cell_index(position)
+        if index is not None:
+            self.grid[index] += 1
+            self.free_cells.remove(index)
+
+    def vacate(self, position):
+        index = self.cell_index(position)
+        if index is not None:
+            self.grid[index] -= 1
+            if self.grid[index] == 0 and self.is_interior(index) and position != self.food:
+                self.free_cells.add(index)
+
+    def set_board(self, snake, obstacles):
+        # Rebuild the snake body and the occupancy grid from scratch.
+        # The grid holds one byte per cell counting the snake segments and
+        # obstacles on it, so every lookup below is O(1). free_cells keeps
+        # the interior cells holding nothing at all (not even food).
+        self.snake = deque(snake)
+        self.obstacles = list(obstacles)
+        self.food = None
+        self.grid = bytearray(self.cols * self.rows)
+        self.free_cells = self.interior().copy()
+        for position in self.snake:
+            self.occupy(position)
+        for position in self.obstacles:
+            self.occupy(position)
+
+    def cell_typecode(self):
+        return "H" if self.cols * self.rows <= 0x10000 else "I"
+
+    def snapshot(self):
+        # The whole game as bytes; restore() brings it back exactly, RNG
+        # included, so the game goes on as if it had never stopped
+        version, words, gauss = self.rng.getstate()
+        flags = (GAME_OVER if self.is_game_over else 0) | (GAUSS if gauss is not None else 0)
+        cell_index = self.cell_index
+        header = SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, self.cols, self.rows, self.cell_size, self.delay,
+            self.score, DIRECTIONS.index(self.direction), flags, self.seed, *self.snake[0],
+            NO_CELL if self.food is None else cell_index(self.food),
+            len(self.snake), len(self.obstacles), gauss or 0.0,
+        )
+        code = self.cell_typecode()
+        body = array(code, map(cell_index, islice(self.snake, 1, None)))
+        obstacles = array(code, map(cell_index, self.obstacles))
+        return b"".join((header, body, obstacles, array("I", words)))
+
+    def restore(self, data):
+        # Take over a snapshot() of a game on the same board. data can be
+        # any buffer, e.g. a memory-mapped file. It is checked before any
+        # state changes, so a bad snapshot leaves the game as it was.
+        view = memoryview(data)
+        if len(view) < SNAPSHOT_HEADER.size:
+            raise ValueError("snapshot is truncated")
+        (magic, cols, rows, cell_size, delay, score, direction, flags, seed, head_x, head_y,
+         food, length, obstacle_count, gauss) = SNAPSHOT_HEADER.unpack_from(view)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("not a Snake snapshot")
+        if (cols, rows, cell_size) != (self.cols, self.rows, self.cell_size):
+            raise ValueError(f"snapshot is for a {cols}x{rows} board of {cell_size}px cells")
+        size = cols * rows
+        code = self.cell_typecode()
+        cell_bytes = array(code).itemsize
+        cells = length - 1 + obstacle_count
+        if length < 1 or len(view) != SNAPSHOT_HEADER.size + cells * cell_bytes + MT_WORDS * 4:
+            raise ValueError("snapshot is truncated or corrupt")
+
+        def take(typecode, count):
+            nonlocal pos
+            values = array(typecode)
+            values.frombytes(view[pos:pos + count * values.itemsize])
+            pos += count * values.itemsize
+            return values
+
+        pos = SNAPSHOT_HEADER.size
+        body = take(code, length - 1)
+        obstacles = take(code, obstacle_count)
+        words = tuple(take("I", MT_WORDS))
+        if max(body + obstacles, default=0) >= size or (food != NO_CELL and food >= size):
+            raise ValueError("snapshot has cells off the board")
+        if direction >= len(DIRECTIONS):
+            raise ValueError("snapshot is truncated or corrupt")
+        self.rng.setstate((3, words, gauss if flags & GAUSS else None))  # checks the words
+
+        # Pixel positions come from a table built once per board
+        positions = self.positions()
+        self.snake = deque(map(positions.__getitem__, body))
+        self.snake.appendleft((head_x, head_y))
+        self.obstacles = list(map(positions.__getitem__, obstacles))
+        self.food = None if food == NO_CELL else positions[food]
+
+        # Rebuild the grid and free cells from the cells. The body after
+        # the head and the obstacles never share a cell (only the head can
+        # land on one of them), so they are set in one pass without
+        # counting; the free cells start from the empty board's.
+        grid = bytearray(size)
+        deque(map(grid.__setitem__, body, repeat(1)), maxlen=0)
+        deque(map(grid.__setitem__, obstacles, repeat(1)), maxlen=0)
+        head = self.cell_index((head_x, head_y))
+        if head is not None:
+            grid[head] += 1
+        self.grid = grid
+        free_cells = self.interior().copy()
+        taken = set(body)
+        taken.update(obstacles)
+        if head is not None:
+            taken.add(head)
+        if food != NO_CELL:
+            taken.add(food)
+        deque(map(free_cells.remove, sorted(taken)), maxlen=0)
+        self.free_cells = free_cells
+        self.score = score
+        self.direction = DIRECTIONS[direction]
+        self.delay = delay
+        self.seed = seed
+        self.is_game_over = bool(flags & GAME_OVER)
+
+    def positions(self):
+        # Pixel position of every cell index, built on first use
+        if self.position_table is None:
+            self.position_table = [self.cell_position(i) for i in range(self.cols * self.rows)]
+        return self.position_table
+
+    def interior(self):
+        # FreeCells of the empty board, built on first use; copy() it
+        if self.interior_table is None:
+            self.interior_table = FreeCells(self.cols * self.rows)
+            for index in range(self.cols * self.rows):
+                if self.is_interior(index):
+                    self.interior_table.add(index)
+        return self.interior_table
+
+    def load_state(self, state):
+        # Take over a game from elsewhere, e.g. SnakeEngine.lane_state(i)
+        self.set_board(state["snake"], state["obstacles"])
+        self.food = state["food"]
+        if self.food is not None:
+            self.free_cells.remove(self.cell_index(self.food))
+        self.score = state["score"]
+        self.direction = state["direction"]
+        self.is_game_over = state.get("is_game_over", False)
+
+    def random_free_cell(self):
+        # A uniformly random free cell. The pick depends only on which
+        # cells are free and on the RNG, not on the order free_cells keeps
+        # them in, so a restored snapshot goes on exactly like the game it
+        # was taken from. As in SnakeEngine._place, a few guesses over the
+        # interior find one on most boards; crowded ones fall back to an
+        # exact choice.
+        interior = self.interior().cells
+        for _ in range(8):
+            index = interior[self.rng.randrange(len(interior))]
+            if index in self.free_cells:
+                return index
+        free = sorted(self.free_cells.cells)
+        return free[self.rng.randrange(len(free))]
+
+    def create_food(self):
+        # Place food in a random free position, or return None if the
+        # board is full
+        if not self.free_cells:
+            return None
+        index = self.random_free_cell()
+        self.free_cells.remove(index)
+        return self.cell_position(index)
+
+    def create_obstacle(self):
+        # Create a new obstacle when score increases, if there is room
+        if not self.free_cells:
+            return
+        position = self.cell_position(self.random_free_cell())
+        self.obstacles.append(position)
+        self.occupy(position)
+
+    def move_snake(self):
+        # Get current head position
+        head_x, head_y = self.snake[0]
+
+        # Calculate new head position based on direction
+        if self.direction == "Left":
+            new_head = (head_x - self.cell_size, head_y)
+        elif self.direction == "Right":
+            new_head = (head_x + self.cell_size, head_y)
+        elif self.direction == "Up":
+            new_head = (head_x, head_y - self.cell_size)
+        elif self.direction == "Down":
+            new_head = (head_x, head_y + self.cell_size)
+
+        # Add new head to snake
+        self.snake.appendleft(new_head)
+        self.occupy(new_head)
+
+        # Check for food collision
+        if new_head == self.food:
+            # Snake grows, don't remove tail
+            self.score += 1
+            self.food = self.create_food()
+
+            # Create obstacle every 2 points after score 10
+            if self.score >= 10 and (self.score - 10) % 2 == 0:
+                self.create_obstacle()
+        else:
+            # Remove tail if no food eaten
+            self.vacate(self.snake.pop())
+
+    def check_collisions(self):
+        # Get head cell
+        index = self.cell_index(self.snake[0])
+
+        # Check for wall collisions
+        if index is None:
+            return True
+
+        # Check for self-collision or obstacle collision: the head shares
+        # its cell with another body segment or an obstacle
+        if self.grid[index] > 1:
+            return True
+
+        return False
+
+    def apply_input(self, channel, value):
+        # Replay one recorded input; the direction was already checked for
+        # 180-degree turns when it was recorded
+        if channel == DIRECTION:
+            self.direction = DIRECTIONS[value]
+
+    def tick(self):
+        # One game tick; the game is over when the snake crashed or there
+        # is nowhere left to put food
+        self.move_snake()
+        if self.check_collisions() or self.food is None:
+            self.is_game_over = True
+        return self.is_game_over
@@ -0,0 +1,171 @@
+import numpy as np
+
+# Directions are numbered so that the opposite of d is (d + 2) % 4. This
+# is not the order of snake_core.DIRECTIONS, which recordings and the
+# Snake server use, hence the separate name.
+LEFT, UP, RIGHT, DOWN = 0, 1, 2, 3
+ENGINE_DIRECTIONS = ("Left", "Up", "Right", "Down")
+DX = np.array([-1, 0, 1, 0], dtype=np.int32)
+DY = np.array([0, -1, 0, 1], dtype=np.int32)
+
+# Cell contents of the occupancy grid
+EMPTY, BODY, OBSTACLE = 0, 1, 2
+
+
+class SnakeEngine:
+    """Headless Snake: N independent games stepped together in NumPy arrays.
+
+    Uses the same rules as SnakeGame (same board, start position, food and
+    obstacle placement, scoring), but cells are flat indices y * cols + x
+    instead of pixel tuples.
+    """
+
+    def __init__(self, n_games, cols=30, rows=20, seed=None):
+        self.n = n_games
+        self.cols = cols
+        self.rows = rows
+        self.n_cells = cols * rows
+        self.rng = np.random.default_rng(seed)
+
+        # Food and obstacles never go on the outer ring of cells
+        xs, ys = np.meshgrid(np.arange(1, cols - 1), np.arange(1, rows - 1))
+        self.interior = (ys * cols + xs).ravel().astype(np.int32)
+        self.interior_mask = np.zeros(self.n_cells, dtype=bool)
+        self.interior_mask[self.interior] = True
+
+        # The body is a ring buffer per game; head[i] indexes the head slot
+        self.body = np.zeros((n_games, self.n_cells), dtype=np.int32)
+        self.head = np.zeros(n_games, dtype=np.int32)
+        self.length = np.zeros(n_games, dtype=np.int32)
+        self.grid = np.zeros((n_games, self.n_cells), dtype=np.int8)
+        self.food = np.full(n_games, -1, dtype=np.int32)
+        self.direction = np.full(n_games, RIGHT, dtype=np.int8)
+        self.score = np.zeros(n_games, dtype=np.int32)
+        self.done = np.zeros(n_games, dtype=bool)
+        self.ticks = np.zeros(n_games, dtype=np.int64)
+
+        self._lanes = np.arange(n_games)
+        self.reset()
+
+    def reset(self, mask=None):
+        # Reset the selected games (all of them by default) to the start state
+        lanes = self._lanes if mask is None else np.flatnonzero(mask)
+        if len(lanes) == 0:
+            return
+
+        self.grid[lanes] = EMPTY
+        self.body[lanes] = 0
+        # Start snake matches SnakeGame: (100, 100), (80, 100), (60, 100)
+        start = np.array([5 * self.cols + 3, 5 * self.cols + 4, 5 * self.cols + 5], dtype=np.int32)
+        self.body[lanes, :3] = start
+        self.head[lanes] = 2
+        self.length[lanes] = 3
+        self.grid[lanes[:, None], start] = BODY
+        self.direction[lanes] = RIGHT
+        self.score[lanes] = 0
+        self.done[lanes] = False
+        self.ticks[lanes] = 0
+        self.food[lanes] = -1
+        self.food[lanes] = self._place(lanes)
+
+    def _place(self, lanes):
+        # Pick a uniformly random empty interior cell for each lane.
+        # A few vectorized rejection rounds handle almost every lane; the
+        # rest (crowded boards) fall back to an exact choice over free cells.
+        cells = np.full(len(lanes), -1, dtype=np.int32)
+        pending = np.arange(len(lanes))
+        for _ in range(8):
+            if len(pending) == 0:
+                return cells
+            guess = self.interior[self.rng.integers(0, len(self.interior), len(pending))]
+            free = (self.grid[lanes[pending], guess] == EMPTY) & (guess != self.food[lanes[pending]])
+            cells[pending[free]] = guess[free]
+            pending = pending[~free]
+
+        for k in pending:
+            lane = lanes[k]
+            free = np.flatnonzero((self.grid[lane] == EMPTY) & self.interior_mask)
+            free = free[free != self.food[lane]]
+            if len(free):
+                cells[k] = free[self.rng.integers(0, len(free))]
+        return cells
+
+    def step(self, actions=None):
+        # Advance every running game by one tick.
+        # actions holds one direction per game (LEFT/UP/RIGHT/DOWN, or -1
+        # to keep going straight). Returns (ate, died) boolean arrays. Like
+        # SnakeCore.tick, a game also ends when its food can't be placed
+        # because the board is full; that sets done but not died.
+        ate = np.zeros(self.n, dtype=bool)
+        died = np.zeros(self.n, dtype=bool)
+        lanes = np.flatnonzero(~self.done)
+        if len(lanes) == 0:
+            return ate, died
+
+        # Turn, ignoring 180-degree turns like change_direction does
+        if actions is not None:
+            act = np.asarray(actions, dtype=np.int8)[lanes]
+            turn = (act >= 0) & (act != (self.direction[lanes] + 2) % 4)
+            self.direction[lanes[turn]] = act[turn]
+
+        cap = self.n_cells
+        head_cell = self.body[lanes, self.head[lanes]]
+        d = self.direction[lanes]
+        x = head_cell % self.cols + DX[d]
+        y = head_cell // self.cols + DY[d]
+        outside = (x < 0) | (x >= self.cols) | (y < 0) | (y >= self.rows)
+        new_cell = np.where(outside, 0, y * self.cols + x)
+
+        eats = ~outside & (new_cell == self.food[lanes])
+
+        # The tail moves away before the head arrives, so chasing the tail is safe
+        movers = lanes[~eats]
+        tail_slot = (self.head[movers] - self.length[movers] + 1) % cap
+        self.grid[movers, self.body[movers, tail_slot]] = EMPTY
+
+        hit = outside | (self.grid[lanes, new_cell] != EMPTY)
+        died[lanes[hit]] = True
+        self.done[lanes[hit]] = True
+
+        alive = ~hit
+        live = lanes[alive]
+        slot = (self.head[live] + 1) % cap
+        self.head[live] = slot
+        self.body[live, slot] = new_cell[alive]
+        self.grid[live, new_cell[alive]] = BODY
+        self.ticks[live] += 1
+
+        eaten = lanes[eats & alive]
+        ate[eaten] = True
+        if len(eaten):
+            self.length[eaten] += 1
+            self.score[eaten] += 1
+            self.food[eaten] = -1
+            self.food[eaten] = self._place(eaten)
+            self.done[eaten[self.food[eaten] < 0]] = True
+
+            # One obstacle every 2 points from score 10 on
+            score = self.score[eaten]
+            grow = eaten[(score >= 10) & ((score - 10) % 2 == 0)]
+            if len(grow):
+                cells = self._place(grow)
+                placed = cells >= 0
+                self.grid[grow[placed], cells[placed]] = OBSTACLE
+
+        return ate, died
+
+    def lane_state(self, lane, cell_size=20):
+        # Export one game in SnakeGame's format (pixel tuples, head first)
+        length = int(self.length[lane])
+        slots = (int(self.head[lane]) - np.arange(length)) % self.n_cells
+        cells = self.body[lane, slots]
+        to_xy = lambda c: (int(c % self.cols) * cell_size, int(c // self.cols) * cell_size)
+        food = int(self.food[lane])
+        return {
+            "snake": [to_xy(c) for c in cells],
+            "food": to_xy(food) if food >= 0 else None,
+            "obstacles": [to_xy(c) for c in np.flatnonzero(self.grid[lane] == OBSTACLE)],
+            "score": int(self.score[lane]),
+            "direction": ENGINE_DIRECTIONS[self.direction[lane]],
+            "is_game_over": bool(self.done[lane]),
+        }
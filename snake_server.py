@@ -0,0 +1,393 @@
+import argparse
+import asyncio
+import random
+import socket
+import struct
+import time
+from collections import deque
+
+from snake_core import DIRECTIONS, SnakeCore
+
+# Wire format: every message is a little-endian u16 length, then a type
+# byte and its fields. Cells are board indices (y * cols + x) as u32, with
+# NO_CELL for "none" (no food, or a head that left the board).
+#
+#   server -> client
+#     START  seed u32, cols u16, rows u16, cell_size u16, delay u16,
+#            score u32, direction u8, food u32,
+#            snake length u32 + cells (head first),
+#            obstacle count u32 + cells
+#     TICK   head u32, flags u8, [food u32 if FOOD], [obstacle u32 if OBSTACLE]
+#   client -> server
+#     TURN     direction u8 (index into DIRECTIONS)
+#     RESTART  (no fields)
+#
+# A tick is 8 bytes on the wire unless the snake ate.
+
+START, TICK, TURN, RESTART = 1, 2, 3, 4
+ATE, FOOD, OBSTACLE, GAME_OVER = 1, 2, 4, 8
+NO_CELL = 0xFFFFFFFF
+
+LENGTH = struct.Struct("<H")
+START_FIELDS = struct.Struct("<BIHHHHIBI")
+TICK_FIELDS = struct.Struct("<BIB")
+CELL = struct.Struct("<I")
+
+
+def frame(body):
+    return LENGTH.pack(len(body)) + body
+
+
+def cells_field(cells):
+    return struct.pack(f"<I{len(cells)}I", len(cells), *cells)
+
+
+def cell_or_none(game, position):
+    index = None if position is None else game.cell_index(position)
+    return NO_CELL if index is None else index
+
+
+def encode_start(game):
+    body = START_FIELDS.pack(
+        START, game.seed, game.cols, game.rows, game.cell_size, game.delay,
+        game.score, DIRECTIONS.index(game.direction), cell_or_none(game, game.food),
+    )
+    body += cells_field([game.cell_index(position) for position in game.snake])
+    body += cells_field([game.cell_index(position) for position in game.obstacles])
+    return frame(body)
+
+
+def read_cells(body, pos):
+    (count,), pos = CELL.unpack_from(body, pos), pos + CELL.size
+    cells = struct.unpack_from(f"<{count}I", body, pos)
+    return cells, pos + count * CELL.size
+
+
+def decode_start(body):
+    _, seed, cols, rows, cell_size, delay, score, direction, food = START_FIELDS.unpack_from(body)
+    snake, pos = read_cells(body, START_FIELDS.size)
+    obstacles, pos = read_cells(body, pos)
+    return {
+        "seed": seed, "width": cols * cell_size, "height": rows * cell_size,
+        "cell_size": cell_size, "delay": delay, "score": score,
+        "direction": DIRECTIONS[direction], "food": food,
+        "snake": snake, "obstacles": obstacles,
+    }
+
+
+def apply_start(game, start):
+    # Make a SnakeCore with the same board (see decode_start) show the
+    # session's state
+    position = game.cell_position
+    game.seed = start["seed"]
+    game.load_state({
+        "snake": [position(cell) for cell in start["snake"]],
+        "obstacles": [position(cell) for cell in start["obstacles"]],
+        "food": None if start["food"] == NO_CELL else position(start["food"]),
+        "score": start["score"],
+        "direction": start["direction"],
+    })
+
+
+def apply_tick(game, body):
+    # Replay one server tick on a mirrored SnakeCore: the same moves as
+    # move_snake, but food and obstacles come from the server
+    _, head, flags = TICK_FIELDS.unpack_from(body)
+    pos = TICK_FIELDS.size
+    if head != NO_CELL:
+        position = game.cell_position(head)
+        game.snake.appendleft(position)
+        game.occupy(position)
+    if flags & ATE:
+        game.score += 1
+    if flags & FOOD:
+        (food,) = CELL.unpack_from(body, pos)
+        pos += CELL.size
+        game.food = None if food == NO_CELL else game.cell_position(food)
+        if game.food is not None:
+            game.free_cells.remove(food)
+    if flags & OBSTACLE:
+        (cell,) = CELL.unpack_from(body, pos)
+        game.obstacles.append(game.cell_position(cell))
+        game.occupy(game.obstacles[-1])
+    if head != NO_CELL and not flags & ATE:
+        game.vacate(game.snake.pop())
+    if flags & GAME_OVER:
+        game.is_game_over = True
+
+
+class TimingWheel:
+    # Sessions share one timer: the wheel has one slot per `resolution`
+    # seconds of `period`, and turn() hands out the sessions in the next
+    # slot. Each session sits in one slot, so it comes up once per period,
+    # and new sessions go in the emptiest slot to spread the work.
+    def __init__(self, period, resolution):
+        self.resolution = period / max(1, round(period / resolution))
+        self.slots = [{} for _ in range(round(period / self.resolution))]
+        self.position = 0
+
+    def __len__(self):
+        return sum(len(slot) for slot in self.slots)
+
+    def add(self, session):
+        slot = min(range(len(self.slots)), key=lambda i: len(self.slots[i]))
+        self.slots[slot][id(session)] = session
+        return slot
+
+    def remove(self, session, slot):
+        self.slots[slot].pop(id(session), None)
+
+    def turn(self):
+        sessions = list(self.slots[self.position].values())
+        self.position = (self.position + 1) % len(self.slots)
+        return sessions
+
+
+class Session:
+    # One player's game on the server
+    def __init__(self, server, writer):
+        self.server = server
+        self.writer = writer
+        self.game = SnakeCore(random.randrange(2 ** 32), **server.board)
+        self.turns = deque(maxlen=3)
+        self.slot = server.wheel.add(self)
+        self.send(encode_start(self.game))
+
+    def send(self, data):
+        # Drop players that stopped reading instead of buffering forever
+        if self.writer.transport.get_write_buffer_size() > self.server.max_buffer:
+            self.writer.close()
+        else:
+            self.writer.write(data)
+
+    def handle(self, body):
+        kind = body[0]
+        if kind == TURN and body[1] < len(DIRECTIONS):
+            self.turns.append(DIRECTIONS[body[1]])
+        elif kind == RESTART:
+            self.game.reset()
+            self.turns.clear()
+            self.send(encode_start(self.game))
+
+    def tick(self):
+        game = self.game
+        if game.is_game_over or self.writer.is_closing():
+            return
+
+        # Like SnakeGame.take_turn: the first queued turn that is real
+        while self.turns and not game.change_direction(self.turns.popleft()):
+            pass
+
+        score, food, obstacles = game.score, game.food, len(game.obstacles)
+        game.tick()
+        flags = ATE if game.score != score else 0
+        extra = b""
+        if game.food != food:
+            flags |= FOOD
+            extra += CELL.pack(cell_or_none(game, game.food))
+        if len(game.obstacles) != obstacles:
+            flags |= OBSTACLE
+            extra += CELL.pack(game.cell_index(game.obstacles[-1]))
+        if game.is_game_over:
+            flags |= GAME_OVER
+        head = cell_or_none(game, game.snake[0])
+        self.send(frame(TICK_FIELDS.pack(TICK, head, flags) + extra))
+
+    def close(self):
+        self.server.wheel.remove(self, self.slot)
+        self.writer.close()
+
+
+class SnakeServer:
+    """Headless Snake sessions for any number of players in one event loop.
+
+    Every connection gets its own SnakeCore. All sessions are ticked from
+    one TimingWheel instead of a timer each, and each tick sends the
+    player a few bytes of change (see the wire format above).
+    """
+
+    def __init__(self, width=600, height=400, cell_size=20, delay=100, resolution=0.005, max_buffer=64 * 1024):
+        self.board = {"width": width, "height": height, "cell_size": cell_size, "delay": delay}
+        self.wheel = TimingWheel(delay / 1000, resolution)
+        self.max_buffer = max_buffer
+        self.late_turns = 0  # wheel turns that started a whole slot late
+
+    async def handle_client(self, reader, writer):
+        session = Session(self, writer)
+        try:
+            while True:
+                (size,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+                session.handle(await reader.readexactly(size))
+        except (asyncio.IncompleteReadError, ConnectionError, IndexError):
+            pass
+        finally:
+            session.close()
+
+    async def run_wheel(self):
+        # Turn the wheel on fixed deadlines, so slow turns don't add up
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while True:
+            deadline += self.wheel.resolution
+            delay = deadline - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif -delay > self.wheel.resolution:
+                self.late_turns += 1
+                if -delay > len(self.wheel.slots) * self.wheel.resolution:
+                    deadline = loop.time()  # a whole period behind: skip ahead
+            for session in self.wheel.turn():
+                session.tick()
+
+    async def serve(self, address):
+        if isinstance(address, str):
+            server = await asyncio.start_unix_server(self.handle_client, address)
+        else:
+            server = await asyncio.start_server(self.handle_client, *address)
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.run_wheel())
+
+
+def parse_address(text):
+    # "host:port" for TCP, anything else is a Unix socket path
+    host, sep, port = text.rpartition(":")
+    if sep and port.isdigit():
+        return host or "127.0.0.1", int(port)
+    return text
+
+
+class Connection:
+    # Blocking-socket client for a SnakeServer session, for callers
+    # without an event loop (like the tkinter game). The START message is
+    # read on connect so the board size is known, and applied by the
+    # first receive().
+    def __init__(self, address):
+        address = parse_address(address)
+        if isinstance(address, str):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(address)
+        else:
+            self.sock = socket.create_connection(address)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.buffer = bytearray()
+        while True:
+            body = self.next_message()
+            if body is not None:
+                break
+            data = self.sock.recv(65536)
+            if not data:
+                raise ConnectionError("server closed the connection")
+            self.buffer += data
+        start = decode_start(body)
+        self.config = {key: start[key] for key in ("width", "height", "cell_size")}
+        self.buffer[:0] = frame(body)
+        self.sock.setblocking(False)
+
+    def next_message(self):
+        if len(self.buffer) < LENGTH.size:
+            return None
+        (size,) = LENGTH.unpack_from(self.buffer)
+        if len(self.buffer) < LENGTH.size + size:
+            return None
+        body = bytes(self.buffer[LENGTH.size:LENGTH.size + size])
+        del self.buffer[:LENGTH.size + size]
+        return body
+
+    def send_turn(self, direction):
+        self.sock.sendall(frame(bytes((TURN, DIRECTIONS.index(direction)))))
+
+    def send_restart(self):
+        self.sock.sendall(frame(bytes((RESTART,))))
+
+    def receive(self, game):
+        # Apply every message that has arrived to game; returns how many
+        # did (0 when nothing new came in)
+        try:
+            while True:
+                data = self.sock.recv(65536)
+                if not data:
+                    raise ConnectionError("server closed the connection")
+                self.buffer += data
+        except BlockingIOError:
+            pass
+        applied = 0
+        while (body := self.next_message()) is not None:
+            if body[0] == START:
+                apply_start(game, decode_start(body))
+            elif body[0] == TICK:
+                apply_tick(game, body)
+            applied += 1
+        return applied
+
+    def close(self):
+        self.sock.close()
+
+
+async def load_client(address, stats, rng):
+    # One simulated player: turns at random and restarts when it dies,
+    # keeping a mirrored SnakeCore up to date like a real client would
+    if isinstance(address, str):
+        reader, writer = await asyncio.open_unix_connection(address)
+    else:
+        reader, writer = await asyncio.open_connection(*address)
+    game = None
+    try:
+        while True:
+            (size,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+            body = await reader.readexactly(size)
+            if body[0] == START:
+                start = decode_start(body)
+                if game is None:
+                    game = SnakeCore(0, start["width"], start["height"], start["cell_size"])
+                apply_start(game, start)
+                continue
+            apply_tick(game, body)
+            stats["ticks"] += 1
+            if game.is_game_over:
+                stats["games"] += 1
+                writer.write(frame(bytes((RESTART,))))
+            elif rng.random() < 0.2:
+                writer.write(frame(bytes((TURN, rng.randrange(len(DIRECTIONS))))))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def load_test(address, clients, seconds, seed):
+    stats = {"ticks": 0, "games": 0}
+    rng = random.Random(seed)
+    tasks = [
+        asyncio.create_task(load_client(address, stats, random.Random(rng.random())))
+        for _ in range(clients)
+    ]
+
+    # Let every client connect and settle before counting
+    await asyncio.sleep(1)
+    stats.update(ticks=0, games=0)
+    start = time.perf_counter()
+    await asyncio.sleep(seconds)
+    elapsed = time.perf_counter() - start
+    for task in tasks:
+        task.cancel()
+    print(f"{clients} clients: {stats['ticks'] / elapsed:.0f} ticks/s received, "
+          f"{stats['games']} games finished")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host many headless Snake sessions over a socket")
+    parser.add_argument("address", help="host:port to listen on (or connect to), or a Unix socket path")
+    parser.add_argument("--load", type=int, metavar="N", help="instead of serving, connect N simulated players")
+    parser.add_argument("--seconds", type=float, default=10, help="how long the load test runs")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    address = parse_address(args.address)
+    if args.load:
+        asyncio.run(load_test(address, args.load, args.seconds, args.seed))
+    else:
+        asyncio.run(SnakeServer().serve(address))
+
+
+if __name__ == "__main__":
+    main()
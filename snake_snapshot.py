@@ -0,0 +1,110 @@
+import argparse
+import mmap
+import time
+from collections import deque
+
+from snake_core import SNAPSHOT_HEADER, SNAPSHOT_MAGIC, SnakeCore
+
+
+class SnapshotRing:
+    # The last `size` snapshots, oldest dropped first, for undo
+    def __init__(self, size=100):
+        self.snapshots = deque(maxlen=size)
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    def push(self, data):
+        self.snapshots.append(data)
+
+    def clear(self):
+        self.snapshots.clear()
+
+    def back(self, steps):
+        # Take out the newest `steps` snapshots and return the last of them
+        # (the oldest there is if the ring is shorter), or None if empty
+        data = None
+        while self.snapshots and steps > 0:
+            data = self.snapshots.pop()
+            steps -= 1
+        return data
+
+
+def board_config(data):
+    # SnakeCore keyword arguments for the board a snapshot was taken on
+    if len(data) < SNAPSHOT_HEADER.size:
+        raise ValueError("not a Snake snapshot")
+    magic, cols, rows, cell_size, delay = SNAPSHOT_HEADER.unpack_from(data)[:5]
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("not a Snake snapshot")
+    return {"width": cols * cell_size, "height": rows * cell_size, "cell_size": cell_size, "delay": delay}
+
+
+def save(path, game):
+    with open(path, "wb") as f:
+        f.write(game.snapshot())
+
+
+def load(path, game=None):
+    # Restore a saved game straight from the memory-mapped file, into game
+    # or into a new SnakeCore for the snapshot's board
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if game is None:
+            game = SnakeCore(**board_config(data))
+        game.restore(data)
+    return game
+
+
+def prepare(path, score, cols, rows, seed):
+    # Let the autopilot play until the score is reached and save that state
+    from snake_autopilot import Autopilot
+
+    cell = 20
+    game = SnakeCore(seed, width=cols * cell, height=rows * cell, cell_size=cell)
+    pilot = Autopilot(game)
+    ticks = 0
+    while game.score < score and not game.is_game_over:
+        pilot.steer()
+        game.tick()
+        ticks += 1
+    if game.is_game_over:
+        raise SystemExit(f"game ended at score {game.score} after {ticks} ticks; try another seed")
+    save(path, game)
+    return game, ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prepare or inspect Snake snapshots")
+    sub = parser.add_subparsers(dest="command", required=True)
+    make = sub.add_parser("prepare", help="play with the autopilot up to a score and save the state")
+    make.add_argument("path")
+    make.add_argument("--score", type=int, default=100)
+    make.add_argument("--cols", type=int, default=30)
+    make.add_argument("--rows", type=int, default=20)
+    make.add_argument("--seed", type=int, default=1)
+    info = sub.add_parser("info", help="load a snapshot and time save and restore")
+    info.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "prepare":
+        game, ticks = prepare(args.path, args.score, args.cols, args.rows, args.seed)
+        print(f"saved score {game.score}, length {len(game.snake)} after {ticks} ticks to {args.path}")
+        return
+
+    game = load(args.path)
+    runs = 1000
+    start = time.perf_counter()
+    for _ in range(runs):
+        data = game.snapshot()
+    saved = (time.perf_counter() - start) / runs
+    start = time.perf_counter()
+    for _ in range(runs):
+        game.restore(data)
+    restored = (time.perf_counter() - start) / runs
+    print(f"{game.cols}x{game.rows} board, score {game.score}, length {len(game.snake)}, "
+          f"{len(game.obstacles)} obstacles, {len(data)} bytes")
+    print(f"snapshot {saved * 1e6:.1f} us, restore {restored * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import io
+
+import pytest
+
+import hi
+
+LINES = ["1 2 3\n", "4\n", "5 6\n"]
+
+
+def test_mixed_field_counts_skip_bad_lines():
+  errors = []
+  assert hi.add_chunk(LINES, errors) == [None, None, 11]
+  assert errors == [(0, "1 2 3"), (1, "4")]
+
+
+@pytest.mark.skipif(hi.np is None, reason="needs NumPy")
+def test_vectorized_matches_plain():
+  lines = ["1 2\n", "\n", "-3,4\n", " 5  6 \n"]
+  assert hi.add_chunk(lines, []) == hi.add_lines(lines, []) == [3, None, 1, 11]
+
+
+def test_batch_output_lines_up_with_input(capfd):
+  hi.run_batch(io.StringIO("1 2\n\nx 3\n4 5\n"), chunk_size=3)
+  out, err = capfd.readouterr()
+  assert out == "3\n\n\n9\n"
+  assert err == "line 3: skipped 'x 3': expected two integers\n"
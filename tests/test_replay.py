@@ -0,0 +1,75 @@
+import random
+
+from pong_core import DIFFICULTIES, DIFFICULTY, PADDLE, RESET, PingPongCore
+from replay import Player, Recorder, Recording
+from snake_autopilot import Autopilot
+from snake_core import DIRECTION, DIRECTIONS, SnakeCore
+
+
+def snake_state(game):
+  return (list(game.snake), list(game.obstacles), game.food, game.score, game.direction,
+          game.is_game_over, game.rng.getstate())
+
+
+def pong_state(game):
+  return (game.ball_x, game.ball_y, game.ball_speed_x, game.ball_speed_y, game.player_y, game.ai_y,
+          game.player_score, game.ai_score, game.difficulty, game.is_game_over, game.rng.getstate())
+
+
+def record_snake(seed, ticks):
+  # Play with the autopilot as SnakeGame.update records; returns the
+  # recording and the state before each tick
+  game = SnakeCore(seed)
+  recorder = Recorder("snake", seed, game.config())
+  pilot = Autopilot(game)
+  states = []
+  while recorder.ticks < ticks and not game.is_game_over:
+    states.append(snake_state(game))
+    pilot.steer()
+    recorder.record(DIRECTION, DIRECTIONS.index(game.direction))
+    recorder.advance()
+    game.tick()
+  states.append(snake_state(game))
+  return recorder.finish(), states
+
+
+def record_pong(seed, ticks):
+  # Move the paddle at random, change the difficulty now and then and
+  # start a new match after each one, as PingPongGame.game_loop records
+  game = PingPongCore(seed)
+  recorder = Recorder("pong", seed, game.config())
+  rng = random.Random(seed)
+  states = []
+  for _ in range(ticks):
+    states.append(pong_state(game))
+    if game.is_game_over:
+      game.reset_match()
+      recorder.record(RESET, 1, force=True)
+    game.player_y = max(0, min(game.height - game.paddle_height, game.player_y + rng.choice((-4, 0, 4))))
+    if rng.random() < 0.001:
+      game.difficulty = rng.choice(DIFFICULTIES)
+    recorder.record(PADDLE, game.player_y)
+    recorder.record(DIFFICULTY, DIFFICULTIES.index(game.difficulty))
+    recorder.advance()
+    game.tick()
+  states.append(pong_state(game))
+  return recorder.finish(), states
+
+
+def test_snake_replay_matches_the_game(tmp_path):
+  recording, states = record_snake(5, 3000)
+  recording.save(tmp_path / "snake.rpl")
+  player = Player(Recording.load(tmp_path / "snake.rpl"), keyframe_interval=500)
+  assert snake_state(player.play_to_end()) == states[-1]
+  # Back to earlier ticks, from the keyframes, and forward again
+  for tick in (1700, 500, 0, 1234, len(states) - 1):
+    assert snake_state(player.seek(tick)) == states[tick]
+
+
+def test_pong_replay_matches_the_game(tmp_path):
+  recording, states = record_pong(3, 20000)
+  recording.save(tmp_path / "pong.rpl")
+  player = Player(Recording.load(tmp_path / "pong.rpl"), keyframe_interval=1000)
+  assert pong_state(player.play_to_end()) == states[-1]
+  for tick in (15000, 999, 1000, 7321, 20000):
+    assert pong_state(player.seek(tick)) == states[tick]
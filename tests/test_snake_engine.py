@@ -0,0 +1,93 @@
+import numpy as np
+
+from snake_core import SnakeCore
+from snake_engine import BODY, DX, DY, EMPTY, OBSTACLE, RIGHT, SnakeEngine
+
+
+def check_lane(engine, lane):
+  # The body ring, the grid, food, obstacles and score agree
+  cols = engine.cols
+  length = int(engine.length[lane])
+  slots = (int(engine.head[lane]) - np.arange(length)) % engine.n_cells
+  cells = engine.body[lane, slots]
+  grid = engine.grid[lane]
+  assert len(set(cells.tolist())) == length
+  assert set(np.flatnonzero(grid == BODY).tolist()) == set(cells.tolist())
+  steps = np.abs(np.diff(cells % cols)) + np.abs(np.diff(cells // cols))
+  assert (steps == 1).all()
+  assert length == 3 + engine.score[lane]
+  food = engine.food[lane]
+  assert food >= 0 and grid[food] == EMPTY and engine.interior_mask[food]
+  obstacles = np.flatnonzero(grid == OBSTACLE)
+  assert engine.interior_mask[obstacles].all()
+  score = int(engine.score[lane])
+  assert len(obstacles) == (0 if score < 10 else (score - 10) // 2 + 1)
+
+
+def greedy(engine, rng):
+  # Toward the food through empty cells, with a random move now and then,
+  # so games get past score 10 (obstacles) and still end
+  actions = np.full(engine.n, -1)
+  for lane in np.flatnonzero(~engine.done):
+    head = engine.body[lane, engine.head[lane]]
+    x, y = head % engine.cols, head // engine.cols
+    fx, fy = engine.food[lane] % engine.cols, engine.food[lane] // engine.cols
+    for d in sorted(range(4), key=lambda d: abs(x + DX[d] - fx) + abs(y + DY[d] - fy)):
+      nx, ny = x + DX[d], y + DY[d]
+      if 0 <= nx < engine.cols and 0 <= ny < engine.rows and engine.grid[lane, ny * engine.cols + nx] == EMPTY:
+        actions[lane] = d
+        break
+    if rng.random() < 0.02:
+      actions[lane] = rng.integers(0, 4)
+  return actions
+
+
+def test_step_keeps_grid_and_body_in_sync():
+  engine = SnakeEngine(32, cols=12, rows=10, seed=1)
+  rng = np.random.default_rng(2)
+  deaths = eaten = best = 0
+  for step in range(1000):
+    done = engine.done.copy()
+    frozen = engine.grid[done].copy(), engine.body[done].copy(), engine.score[done].copy()
+    ate, died = engine.step(greedy(engine, rng))
+    deaths += died.sum()
+    eaten += ate.sum()
+    assert not (ate & died).any() and not (died & done).any()
+    for before, after in zip(frozen, (engine.grid[done], engine.body[done], engine.score[done])):
+      assert (before == after).all()
+    for lane in np.flatnonzero(~engine.done):
+      check_lane(engine, lane)
+    best = max(best, engine.score.max())
+    # Finished games stay as they are until reset
+    if step % 50 == 49:
+      engine.reset(engine.done)
+  assert deaths > 0 and eaten > 0 and best >= 12
+
+
+def test_lane_state_matches_snake_core():
+  engine = SnakeEngine(8, cols=12, rows=10, seed=3)
+  rng = np.random.default_rng(4)
+  for _ in range(200):
+    engine.step(np.where(rng.random(engine.n) < 0.2, rng.integers(0, 4, engine.n), -1))
+    engine.reset(engine.done)
+  for lane in range(engine.n):
+    game = SnakeCore(width=12 * 20, height=10 * 20)
+    game.load_state(engine.lane_state(lane))
+    assert (np.frombuffer(bytes(game.grid), dtype=np.uint8) > 0).tolist() == (engine.grid[lane] != EMPTY).tolist()
+
+
+def test_full_board_ends_the_lane():
+  # Lane 0: every interior cell but the food taken by obstacles, so eating
+  # leaves nowhere for new food. Lane 1 plays on as usual.
+  engine = SnakeEngine(2, cols=8, rows=8, seed=5)
+  grid = engine.grid[0]
+  food = 5 * engine.cols + 6
+  grid[engine.interior[grid[engine.interior] == EMPTY]] = OBSTACLE
+  grid[food] = EMPTY
+  engine.food[0] = food
+  engine.direction[:] = RIGHT
+  ate, died = engine.step()
+  assert ate[0] and not died[0]
+  assert engine.done[0] and engine.food[0] < 0
+  assert not engine.done[1]
+  check_lane(engine, 1)
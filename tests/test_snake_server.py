@@ -0,0 +1,72 @@
+import random
+from types import SimpleNamespace
+
+from snake_autopilot import Autopilot
+from snake_core import DIRECTIONS, SnakeCore
+from snake_server import LENGTH, RESTART, START, TICK, TURN, Session, apply_start, apply_tick, decode_start
+
+BOARD = {"width": 400, "height": 300, "cell_size": 20, "delay": 100}
+
+
+class Writer:
+  # Collects what a Session sends
+  def __init__(self):
+    self.data = bytearray()
+    self.transport = SimpleNamespace(get_write_buffer_size=lambda: 0)
+
+  def write(self, data):
+    self.data += data
+
+  def is_closing(self):
+    return False
+
+  def messages(self):
+    # Bodies of the framed messages written since the last call
+    bodies, pos = [], 0
+    while pos < len(self.data):
+      (size,) = LENGTH.unpack_from(self.data, pos)
+      bodies.append(bytes(self.data[pos + LENGTH.size:pos + LENGTH.size + size]))
+      pos += LENGTH.size + size
+    self.data.clear()
+    return bodies
+
+
+def free_cells(game):
+  cells = game.free_cells
+  assert all(cells.position[cell] == slot for slot, cell in enumerate(cells.cells))
+  assert sum(slot >= 0 for slot in cells.position) == len(cells.cells)
+  return set(cells.cells)
+
+
+def test_mirror_follows_the_server_exactly(monkeypatch):
+  # Session and SnakeCore.reset seed each game with random.randrange
+  monkeypatch.setattr(random, "randrange", random.Random(4).randrange)
+  wheel = SimpleNamespace(add=lambda session: 0, remove=lambda session, slot: None)
+  writer = Writer()
+  session = Session(SimpleNamespace(board=BOARD, wheel=wheel, max_buffer=1 << 16), writer)
+  server = session.game
+  mirror = SnakeCore(**BOARD)
+  pilot = Autopilot(server)
+  games = 0
+  for _ in range(3000):
+    for body in writer.messages():
+      if body[0] == START:
+        apply_start(mirror, decode_start(body))
+        pilot = Autopilot(server)
+        games += 1
+      elif body[0] == TICK:
+        apply_tick(mirror, body)
+    assert bytes(mirror.grid) == bytes(server.grid)
+    assert free_cells(mirror) == free_cells(server)
+    assert (list(mirror.snake), mirror.obstacles, mirror.food, mirror.score, mirror.is_game_over) == (
+      list(server.snake), server.obstacles, server.food, server.score, server.is_game_over)
+
+    if server.is_game_over:
+      session.handle(bytes((RESTART,)))
+      continue
+    direction = server.direction
+    pilot.steer()
+    session.handle(bytes((TURN, DIRECTIONS.index(server.direction))))
+    server.direction = direction  # the session applies the turn itself
+    session.tick()
+  assert games > 1
@@ -0,0 +1,70 @@
+import pytest
+
+from snake_autopilot import Autopilot
+from snake_core import SNAPSHOT_HEADER, SnakeCore
+from snake_snapshot import load, save
+
+
+def state(game):
+  cells = game.free_cells
+  return (list(game.snake), game.obstacles, game.food, game.score, game.direction, game.is_game_over,
+          bytes(game.grid), sorted(cells.cells), game.rng.getstate())
+
+
+def play(game, ticks):
+  # Autopilot moves, as directions, so another game can be given the same
+  pilot = Autopilot(game)
+  directions = []
+  while len(directions) < ticks and not game.is_game_over:
+    pilot.steer()
+    directions.append(game.direction)
+    game.tick()
+  return directions
+
+
+@pytest.mark.parametrize("cols, rows", [(30, 20), (12, 10)])
+def test_restored_game_goes_on_like_the_original(cols, rows):
+  # 12x10 fills up, so food placement also takes the crowded-board path
+  game = SnakeCore(7, width=cols * 20, height=rows * 20)
+  play(game, 300)
+  data = game.snapshot()
+  directions = play(game, 5000)
+
+  copy = SnakeCore(width=cols * 20, height=rows * 20)
+  copy.restore(data)
+  for direction in directions:
+    copy.direction = direction
+    copy.tick()
+  assert state(copy) == state(game)
+
+
+def test_save_and_load(tmp_path):
+  game = SnakeCore(3)
+  play(game, 500)
+  save(tmp_path / "game.sns", game)
+  assert state(load(tmp_path / "game.sns")) == state(game)
+
+
+def test_bad_snapshots_are_rejected():
+  game = SnakeCore(1)
+  play(game, 400)
+  data = game.snapshot()
+  other = SnakeCore(2)
+  before = state(other)
+
+  body = SNAPSHOT_HEADER.size  # first body cell
+  corrupt = [
+    data[:10],  # shorter than the header
+    data[:-1],  # truncated
+    data + b"\0",  # trailing bytes
+    b"XXXX" + data[4:],  # magic
+    data[:body] + b"\xff\xff" + data[body + 2:],  # cell off the board
+    data[:-4] + b"\xff\xff\xff\xff",  # Mersenne Twister position out of range
+  ]
+  for bad in corrupt:
+    with pytest.raises(ValueError):
+      other.restore(bad)
+    assert state(other) == before
+
+  with pytest.raises(ValueError):
+    SnakeCore(1, width=400).restore(data)  # another board
@@ -0,0 +1,77 @@
+import io
+
+import pytest
+
+import user_store
+from user_import import import_users
+from user_search import NameSearch
+from user_store import UserStore
+
+NAMES = ["Alice", "John", "Zoe", "Alex", "Al", "Jonathan Smith", "Mary Jones", "Johnson"]
+
+
+@pytest.fixture
+def store(tmp_path):
+  store = UserStore(str(tmp_path / "users.db"))
+  store.add_many((name, 30 + i) for i, name in enumerate(NAMES))
+  store.add_many((f"Filler {i}", i % 100) for i in range(3000))
+  yield store
+  store.close()
+
+
+def best(store, text):
+  matches = NameSearch(store).fuzzy(text, 3)
+  return matches[0][0] if matches else None
+
+
+@pytest.mark.parametrize("typed, name", [
+  ("Alcie", "Alice"),  # transposition
+  ("Jhon", "John"),  # transposition
+  ("Zoee", "Zoe"),  # insertion
+  ("Aleks", "Alex"),
+  ("Jonathon Smith", "Jonathan Smith"),
+  ("Mary Jnes", "Mary Jones"),  # deletion
+])
+def test_fuzzy_typos(store, typed, name):
+  assert best(store, typed) == name
+
+
+def test_short_names(store):
+  assert best(store, "Al") == "Al"
+  assert best(store, "Zo") == "Zoe"
+
+
+def test_prefix_ignores_case(store):
+  assert [name for name, _ in NameSearch(store).prefix("JOHN")] == ["John", "Johnson"]
+
+
+def test_deleted_users_are_not_found(store):
+  store.db().execute("DELETE FROM users WHERE name = 'Alice'")
+  assert best(store, "Alcie") != "Alice"
+
+
+def test_index_survives_vacuum(store):
+  db = store.db()
+  db.execute("DELETE FROM users WHERE name LIKE 'Filler 1%'")
+  db.commit()
+  db.execute("VACUUM")
+  assert best(store, "Jhon") == "John"
+  assert best(store, "Mary Jnes") == "Mary Jones"
+
+
+
+def test_import_rebuilds_name_index(store):
+  assert best(store, "Jhon") == "John"
+  import_users(store, io.StringIO("name,age\nKatherine,41\nJohn,52\n"))
+  assert best(store, "Katherin") == "Katherine"
+  assert store.get("John") == 52
+  store.db().execute("DELETE FROM users WHERE name = 'Alice'")
+  assert best(store, "Alcie") != "Alice"
+
+
+def test_fuzzy_without_trigram(store, monkeypatch):
+  # SQLite before 3.34: only names one edit away are found
+  monkeypatch.setattr(user_store, "NAME_INDEX", user_store.NAME_INDEX.replace("trigram", "missing"))
+  assert best(store, "Mary Jnes") == "Mary Jones"
+  assert best(store, "Jonathon Smith") == "Jonathan Smith"
+  assert store.name_index() is False
@@ -0,0 +1,87 @@
+import csv
+import json
+from itertools import islice
+
+# Bulk import for users.py. Records are streamed through generators one
+# chunk at a time (read -> chunk -> validate -> store), so memory stays the
+# same whatever the size of the input.
+
+MAX_AGE = 150
+
+
+def read_csv(f):
+  # Yields (line, name, age text); a "name,age" header is skipped
+  reader = csv.reader(f)
+  for row in reader:
+    line = f"line {reader.line_num}"
+    if not row or row == ["name", "age"]:
+      continue
+    if len(row) != 2:
+      yield line, None, f"expected name,age but got {len(row)} fields"
+      continue
+    yield line, row[0].strip(), row[1].strip()
+
+
+def read_jsonl(f):
+  for number, text in enumerate(f, 1):
+    line = f"line {number}"
+    if not text.strip():
+      continue
+    try:
+      record = json.loads(text)
+      yield line, record["name"], record["age"]
+    except (ValueError, KeyError, TypeError) as e:
+      yield line, None, f"bad JSON record ({e})"
+
+
+def records(f, fmt):
+  if fmt == "jsonl":
+    return read_jsonl(f)
+  return read_csv(f)
+
+
+def chunks(iterable, size):
+  iterator = iter(iterable)
+  while True:
+    chunk = list(islice(iterator, size))
+    if not chunk:
+      return
+    yield chunk
+
+
+def validate(chunk):
+  # Splits a chunk into good (name, age) rows and (line, reason) errors
+  rows, errors = [], []
+  for line, name, age in chunk:
+    if name is None:
+      errors.append((line, age))
+      continue
+    if not isinstance(name, str) or not name:
+      errors.append((line, "missing name"))
+      continue
+    try:
+      age = int(str(age))  # rejects 30.5 and true as well as text
+    except (TypeError, ValueError):
+      errors.append((line, f"age {age!r} is not a whole number"))
+      continue
+    if not 0 <= age <= MAX_AGE:
+      errors.append((line, f"age {age} is out of range"))
+      continue
+    rows.append((name, age))
+  return rows, errors
+
+
+def import_users(store, f, fmt="csv", chunk_size=10000, report=None):
+  # Adds every valid record to store; report(line, reason) is called for
+  # each bad one. Returns (imported, rejected).
+  imported = rejected = 0
+  with store.bulk():
+    for chunk in chunks(records(f, fmt), chunk_size):
+      rows, errors = validate(chunk)
+      store.add_many(rows)
+      imported += len(rows)
+      rejected += len(errors)
+      if report is not None:
+        for line, reason in errors:
+          report(line, reason)
+  return imported, rejected
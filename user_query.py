@@ -0,0 +1,65 @@
+from array import array
+from bisect import bisect_left
+
+# Age reports over a UserStore. Listings walk the users_age index, so a
+# range or top-k query costs a B-tree seek plus the rows returned. Counts,
+# histograms and percentiles only read age_counts, which has one row per
+# distinct age however many users there are.
+
+
+class AgeQueries:
+  def __init__(self, store):
+    self.store = store
+
+  def db(self):
+    self.store.flush()
+    return self.store.db()
+
+  def between(self, low, high, limit=None):
+    # (name, age) for low <= age <= high, youngest first
+    return self.db().execute(
+      "SELECT name, age FROM users WHERE age BETWEEN ? AND ? ORDER BY age LIMIT ?",
+      (low, high, -1 if limit is None else limit)
+    )
+
+  def top(self, k, oldest=True):
+    # The k oldest (or youngest) users
+    order = "DESC" if oldest else "ASC"
+    return self.db().execute(f"SELECT name, age FROM users ORDER BY age {order} LIMIT ?", (k,))
+
+  def count(self, low=None, high=None):
+    row = self.db().execute(
+      "SELECT COALESCE(SUM(n), 0) FROM age_counts WHERE age BETWEEN ? AND ?",
+      (-1 if low is None else low, 1 << 62 if high is None else high)
+    ).fetchone()
+    return row[0]
+
+  def counts(self):
+    # Ages and a running total of users up to each age, as compact arrays
+    ages, totals = array("q"), array("q")
+    total = 0
+    for age, n in self.db().execute("SELECT age, n FROM age_counts WHERE n > 0 ORDER BY age"):
+      total += n
+      ages.append(age)
+      totals.append(total)
+    return ages, totals
+
+  def histogram(self, width=10):
+    # [(bucket start, users)] for buckets of `width` years
+    buckets = {}
+    for age, n in self.db().execute("SELECT age, n FROM age_counts WHERE n > 0 ORDER BY age"):
+      start = age // width * width
+      buckets[start] = buckets.get(start, 0) + n
+    return sorted(buckets.items())
+
+  def percentiles(self, ps):
+    # Nearest-rank percentiles, e.g. percentiles([50, 90]) -> [median, p90]
+    ages, totals = self.counts()
+    if not totals:
+      return [None for _ in ps]
+    total = totals[-1]
+    result = []
+    for p in ps:
+      rank = max(1, -(-p * total // 100))  # ceil(p% of total), at least 1
+      result.append(ages[bisect_left(totals, min(rank, total))])
+    return result
@@ -0,0 +1,118 @@
+from collections import Counter
+
+# Name lookups over a UserStore. A prefix search is a range scan of the
+# users_name_key index: one seek, then the first k matches in name order.
+# A fuzzy search reads the id list of each trigram of the query from
+# user_names, at most `postings` ids per list, so its cost depends on the
+# query and k rather than on how many users there are. The users that
+# share the most trigrams with the query are then ranked by edit distance.
+#
+# A typo in a short name leaves few trigrams intact ("jhon" and "john"
+# share only the padded first letter), so names up to SHORT_NAME long also
+# look up every spelling one edit away from the query, each an exact seek
+# in users_name_key. Without user_names (SQLite before 3.34 has no trigram
+# tokenizer) that is all a fuzzy search does, for names of any length.
+
+# Same folding as SQLite's lower(), which only changes ASCII letters, so
+# keys built here line up with the users_name_key index
+ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+# Sorts after every character, so key + END bounds all names starting with key
+END = "\U0010ffff"
+
+SHORT_NAME = 6
+LETTERS = "abcdefghijklmnopqrstuvwxyz -'"
+
+# Older SQLite builds allow at most 999 parameters per statement
+MAX_PARAMS = 999
+
+
+def name_key(name):
+  return name.translate(ASCII_LOWER)
+
+
+def trigrams(text):
+  # Distinct three-letter sequences of the text padded as users.terms is,
+  # as FTS5 phrases ("" escapes a quote)
+  text = f"  {text.lower()} "
+  return sorted({'"' + text[i:i + 3].replace('"', '""') + '"' for i in range(len(text) - 2)})
+
+
+def one_edit(key):
+  # Every string one deletion, swap of neighbours, replacement or insertion
+  # away from key
+  splits = [(key[:i], key[i:]) for i in range(len(key) + 1)]
+  edits = {a + b[1:] for a, b in splits if b}
+  edits |= {a + b[1] + b[0] + b[2:] for a, b in splits if len(b) > 1}
+  edits |= {a + c + b[1:] for a, b in splits if b for c in LETTERS}
+  edits |= {a + c + b for a, b in splits for c in LETTERS}
+  edits.discard(key)
+  return edits
+
+
+def edit_distance(a, b):
+  # Levenshtein distance, one row of the table at a time
+  if len(a) < len(b):
+    a, b = b, a
+  row = list(range(len(b) + 1))
+  for i, ca in enumerate(a, 1):
+    prev, row[0] = row[0], i
+    for j, cb in enumerate(b, 1):
+      prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (ca != cb))
+  return row[-1]
+
+
+class NameSearch:
+  def __init__(self, store):
+    self.store = store
+
+  def db(self):
+    self.store.flush()
+    return self.store.db()
+
+  def prefix(self, text, k=10):
+    # (name, age) for names starting with text, ignoring ASCII case
+    key = name_key(text)
+    return self.db().execute(
+      "SELECT name, age FROM users WHERE lower(name) >= ? AND lower(name) < ? ORDER BY lower(name) LIMIT ?",
+      (key, key + END, k)
+    )
+
+  def fuzzy(self, text, k=10, probes=8, postings=2000):
+    # [(name, age, distance)] for the k names closest to text, nearest first
+    db = self.db()
+    indexed = self.store.name_index()
+    lists = [
+      [user for user, in db.execute("SELECT rowid FROM user_names WHERE user_names MATCH ? LIMIT ?", (gram, postings))]
+      for gram in (trigrams(text) if indexed else [])
+    ]
+    # Only the shortest lists count: they narrow the candidates most, are
+    # read in full, and a typo mostly turns grams into ones no name has
+    lists = sorted((users for users in lists if users), key=len)[:probes]
+    shared = Counter()
+    for users in lists:
+      shared.update(users)
+    candidates = [user for user, _ in shared.most_common(k * 10)]
+    key = name_key(text)
+    if len(key) <= SHORT_NAME or not indexed:
+      edits = list(one_edit(key))
+      candidates += [user for user, in self.lookup(db, "SELECT id FROM users WHERE lower(name) IN", edits)]
+    ranked = sorted(
+      (edit_distance(key, name_key(name)), name, age)
+      for name, age in self.lookup(db, "SELECT name, age FROM users WHERE id IN", list(dict.fromkeys(candidates)))
+    )
+    return [(name, age, distance) for distance, name, age in ranked[:k]]
+
+  def lookup(self, db, query, values):
+    # Rows of `query (?, ...)` for all values, MAX_PARAMS at a time
+    for start in range(0, len(values), MAX_PARAMS):
+      part = values[start:start + MAX_PARAMS]
+      yield from db.execute(f"{query} ({', '.join('?' * len(part))})", part)
+
+  def find(self, text, k=10):
+    # Prefix matches first (distance 0), then the closest fuzzy matches
+    found = [(name, age, 0) for name, age in self.prefix(text, k)]
+    if len(found) < k:
+      seen = {name for name, _, _ in found}
+      found += [match for match in self.fuzzy(text, k) if match[0] not in seen][:k - len(found)]
+    return found
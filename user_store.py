@@ -0,0 +1,199 @@
+import sqlite3
+from contextlib import contextmanager
+
+# Users live in a SQLite file, one row per name. Nothing is read at startup:
+# the file is opened on first use and lookups go through SQLite's on-disk
+# B-tree, so opening a store with millions of users costs the same as an
+# empty one. Writes are buffered and committed in batches, one transaction
+# (and one fsync) per batch instead of per user.
+#
+# Ages have a secondary index (users_age) for range scans, and triggers
+# keep age_counts, the number of users of each age, so counts, histograms
+# and percentiles read at most one row per distinct age (see user_query).
+#
+# Names have two search indexes (see user_search). users_name_key orders
+# users by lower-cased name, so a prefix lookup is one B-tree seek and a
+# walk over the matches. user_names is an FTS5 trigram index over the same
+# rows: for each three-letter sequence, the ids of the users whose name
+# contains it, stored as compressed doclists without positions
+# (detail=none) in about 30 bytes per user. It indexes `terms`, the name
+# padded with spaces, so the first and last letters get trigrams of their
+# own and names of one or two letters get any at all. The index refers to
+# users by id, an INTEGER PRIMARY KEY, which unlike a plain rowid survives
+# VACUUM. Triggers keep it current with every write.
+#
+# user_names is only created by the first fuzzy search (name_index()), so
+# stores that never search don't pay for it, and everything else works
+# on SQLite builds without the trigram tokenizer (added in 3.34). Bulk
+# writes go through bulk(), which rebuilds it once at the end instead of
+# updating it row by row.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+  id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, age INTEGER NOT NULL,
+  terms TEXT GENERATED ALWAYS AS ('  ' || name || ' ') VIRTUAL
+);
+CREATE INDEX IF NOT EXISTS users_age ON users (age);
+CREATE TABLE IF NOT EXISTS age_counts (age INTEGER PRIMARY KEY, n INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS users_name_key ON users (lower(name));
+CREATE TRIGGER IF NOT EXISTS users_insert AFTER INSERT ON users BEGIN
+  INSERT INTO age_counts VALUES (NEW.age, 1) ON CONFLICT(age) DO UPDATE SET n = n + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS users_update AFTER UPDATE OF age ON users WHEN OLD.age != NEW.age BEGIN
+  UPDATE age_counts SET n = n - 1 WHERE age = OLD.age;
+  INSERT INTO age_counts VALUES (NEW.age, 1) ON CONFLICT(age) DO UPDATE SET n = n + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS users_delete AFTER DELETE ON users BEGIN
+  UPDATE age_counts SET n = n - 1 WHERE age = OLD.age;
+END;
+"""
+
+NAME_INDEX = """
+CREATE VIRTUAL TABLE IF NOT EXISTS user_names USING fts5(
+  terms, content='users', content_rowid='id', tokenize='trigram', detail=none
+);
+"""
+
+NAME_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS users_insert_name AFTER INSERT ON users BEGIN
+  INSERT INTO user_names (rowid, terms) VALUES (NEW.id, NEW.terms);
+END;
+CREATE TRIGGER IF NOT EXISTS users_update_name AFTER UPDATE OF name ON users BEGIN
+  INSERT INTO user_names (user_names, rowid, terms) VALUES ('delete', OLD.id, OLD.terms);
+  INSERT INTO user_names (rowid, terms) VALUES (NEW.id, NEW.terms);
+END;
+CREATE TRIGGER IF NOT EXISTS users_delete_name AFTER DELETE ON users BEGIN
+  INSERT INTO user_names (user_names, rowid, terms) VALUES ('delete', OLD.id, OLD.terms);
+END;
+"""
+
+DROP_NAME_TRIGGERS = """
+DROP TRIGGER IF EXISTS users_insert_name;
+DROP TRIGGER IF EXISTS users_update_name;
+DROP TRIGGER IF EXISTS users_delete_name;
+"""
+
+
+class UserStore:
+  def __init__(self, path="users.db", batch_size=1000):
+    self.path = path
+    self.batch_size = batch_size
+    self.pending = []
+    self.conn = None
+    self.names_indexed = None
+
+  def db(self):
+    if self.conn is None:
+      self.conn = sqlite3.connect(self.path)
+      self.conn.execute("PRAGMA journal_mode=WAL")
+      self.conn.execute("PRAGMA synchronous=NORMAL")
+      with self.conn:
+        self.conn.executescript("BEGIN;" + SCHEMA)
+    return self.conn
+
+  def name_index(self):
+    # Whether user_names can be searched, creating it on first use from
+    # the names already stored. False if this SQLite lacks FTS5 or its
+    # trigram tokenizer.
+    if self.names_indexed is None:
+      self.flush()
+      db = self.db()
+      if db.execute("SELECT 1 FROM sqlite_master WHERE name = 'user_names'").fetchone():
+        self.names_indexed = True
+        return True
+      try:
+        with db:
+          db.executescript("BEGIN;" + NAME_INDEX + NAME_TRIGGERS)
+          db.execute("INSERT INTO user_names (user_names) VALUES ('rebuild')")
+        self.names_indexed = True
+      except sqlite3.OperationalError as e:
+        if not str(e).startswith(("no such tokenizer", "no such module")):
+          raise
+        self.names_indexed = False
+    return self.names_indexed
+
+  @contextmanager
+  def bulk(self):
+    # For big imports: writes inside skip the name index triggers, and
+    # user_names (if there is one) is rebuilt once at the end, which is
+    # several times faster than keeping it current row by row
+    self.flush()
+    db = self.db()
+    indexed = db.execute("SELECT 1 FROM sqlite_master WHERE name = 'user_names'").fetchone() is not None
+    if indexed:
+      with db:
+        db.executescript("BEGIN;" + DROP_NAME_TRIGGERS)
+    try:
+      yield self
+    finally:
+      self.flush()
+      if indexed:
+        with db:
+          db.executescript("BEGIN;" + NAME_TRIGGERS)
+          db.execute("INSERT INTO user_names (user_names) VALUES ('rebuild')")
+
+  def add(self, name, age):
+    # Same as user[name] = age; written with the next batch
+    self.pending.append((name, age))
+    if len(self.pending) >= self.batch_size:
+      self.flush()
+
+  def add_many(self, rows):
+    for name, age in rows:
+      self.add(name, age)
+    self.flush()
+
+  def flush(self):
+    if not self.pending:
+      return
+    with self.db():
+      self.conn.executemany(
+        "INSERT INTO users (name, age) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET age = excluded.age",
+        self.pending
+      )
+    self.pending = []
+
+  def get(self, name, default=None):
+    self.flush()
+    row = self.db().execute("SELECT age FROM users WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else default
+
+  def __contains__(self, name):
+    return self.get(name) is not None
+
+  def __len__(self):
+    self.flush()
+    return self.db().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+  def items(self):
+    # Streams (name, age) pairs from the cursor, in insertion order
+    self.flush()
+    return self.db().execute("SELECT name, age FROM users ORDER BY id")
+
+  def pages(self, sort=None, limit=None, offset=0, page_size=1000):
+    # Yields lists of up to page_size (name, age) pairs, sorted by "name"
+    # or "age" (else insertion order). Each order is an index walk, so
+    # rows stream from disk and only one page is held at a time.
+    self.flush()
+    order = {"name": "name", "age": "age, id"}.get(sort, "id")
+    cursor = self.db().execute(
+      f"SELECT name, age FROM users ORDER BY {order} LIMIT ? OFFSET ?",
+      (-1 if limit is None else limit, offset)
+    )
+    while True:
+      page = cursor.fetchmany(page_size)
+      if not page:
+        return
+      yield page
+
+  def close(self):
+    self.flush()
+    if self.conn is not None:
+      self.conn.close()
+      self.conn = None
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
@@ -1,16 +1,158 @@
-user = {}
-
-while True:
-  ch = 'y'
-  while ch != 'n':
-    name = input("Enter Name: ")
-    age = int(input("Enter Age: "))
-    user[name] = age
-
-    print("Do you want to add another user (y/n)?")
-
-    ch = input(">")
-  print("Viewing Users:")
-  for key, value in user.items():
-    print(f"{key} : {value}")
-  break
+import argparse
+import json
+import os
+import sys
+
+from user_import import import_users
+from user_query import AgeQueries
+from user_search import NameSearch
+from user_store import UserStore
+
+
+# Tabs, newlines and backslashes in names are escaped in TSV output
+TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n"})
+
+
+def format_page(page, fmt):
+  if fmt == "tsv":
+    return "".join(f"{name.translate(TSV_ESCAPES)}\t{age}\n" for name, age in page)
+  if fmt == "jsonl":
+    return "".join(json.dumps({"name": name, "age": age}) + "\n" for name, age in page)
+  return "".join(f"{name} : {age}\n" for name, age in page)
+
+
+def write_pages(pages, fmt="text"):
+  # One block-buffered writer for the whole listing, so a page costs one
+  # write and the terminal isn't flushed line by line
+  with open(sys.stdout.fileno(), "w", buffering=1 << 16, encoding="utf-8", closefd=False) as out:
+    sys.stdout.flush()
+    for page in pages:
+      out.write(format_page(page, fmt))
+
+
+def add_interactively(user):
+  while True:
+    ch = 'y'
+    while ch != 'n':
+      name = input("Enter Name: ")
+      age = int(input("Enter Age: "))
+      user.add(name, age)
+
+      print("Do you want to add another user (y/n)?")
+
+      ch = input(">")
+    print("Viewing Users:")
+    write_pages(user.pages())
+    break
+
+
+def bulk_import(user, args):
+  fmt = args.format
+  if fmt is None:
+    fmt = "jsonl" if args.file.endswith((".jsonl", ".json")) else "csv"
+
+  def report(line, reason):
+    print(f"{args.file}: {line}: {reason}", file=sys.stderr)
+
+  if args.file == "-":
+    imported, rejected = import_users(user, sys.stdin, fmt, args.chunk_size, report)
+  else:
+    with open(args.file, newline="", encoding="utf-8") as f:
+      imported, rejected = import_users(user, f, fmt, args.chunk_size, report)
+  print(f"Imported {imported} users, rejected {rejected} rows")
+
+
+def list_users(user, args):
+  try:
+    write_pages(user.pages(args.sort, args.limit, args.offset, args.page_size), args.format)
+  except BrokenPipeError:
+    # Output piped into head or similar, which stopped reading
+    sys.stderr.close()
+
+
+def age_report(user, args):
+  ages = AgeQueries(user)
+  if args.between:
+    low, high = args.between
+    print(f"Users aged {low}-{high}:")
+    for name, age in ages.between(low, high, args.limit):
+      print(f"{name} : {age}")
+  if args.count:
+    low, high = args.count
+    print(f"Users aged {low}-{high}: {ages.count(low, high)}")
+  if args.top:
+    print(f"{args.top} {'youngest' if args.youngest else 'oldest'} users:")
+    for name, age in ages.top(args.top, oldest=not args.youngest):
+      print(f"{name} : {age}")
+  if args.histogram:
+    for start, n in ages.histogram(args.histogram):
+      print(f"{start:>3}-{start + args.histogram - 1:<3} {n}")
+  if args.percentile:
+    for p, age in zip(args.percentile, ages.percentiles(args.percentile)):
+      print(f"p{p:g}: {age}")
+
+
+def search_names(user, args):
+  names = NameSearch(user)
+  if args.prefix:
+    matches = [(name, age, 0) for name, age in names.prefix(args.name, args.limit)]
+  elif args.fuzzy:
+    matches = names.fuzzy(args.name, args.limit)
+  else:
+    matches = names.find(args.name, args.limit)
+  for name, age, distance in matches:
+    print(f"{name} : {age}" + (f"  (~{distance})" if distance else ""))
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Add and view users")
+  commands = parser.add_subparsers(dest="command")
+
+  load = commands.add_parser("import", help="load users from a CSV or JSON lines file")
+  load.add_argument("file", help='file of name,age rows or {"name", "age"} lines; - for stdin')
+  load.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension, else csv")
+  load.add_argument("--chunk-size", type=int, default=10000, help="records read and validated at a time")
+
+  listing = commands.add_parser("list", help="list users, streamed page by page")
+  listing.add_argument("--sort", choices=["name", "age"], help="default: the order users were added")
+  listing.add_argument("--limit", type=int, help="most users listed")
+  listing.add_argument("--offset", type=int, default=0, help="users skipped first")
+  listing.add_argument("--format", choices=["text", "tsv", "jsonl"], default="text")
+  listing.add_argument("--page-size", type=int, default=1000, help="users read and written at a time")
+
+  report = commands.add_parser("ages", help="age range queries and statistics")
+  report.add_argument("--between", nargs=2, type=int, metavar=("LOW", "HIGH"), help="list users in an age range")
+  report.add_argument("--limit", type=int, help="most users listed by --between")
+  report.add_argument("--count", nargs=2, type=int, metavar=("LOW", "HIGH"), help="count users in an age range")
+  report.add_argument("--top", type=int, metavar="K", help="list the K oldest users")
+  report.add_argument("--youngest", action="store_true", help="--top lists the youngest instead")
+  report.add_argument("--histogram", type=int, metavar="WIDTH", help="users per WIDTH-year bucket")
+  report.add_argument("--percentile", type=float, action="append", metavar="P", help="age at percentile P (repeatable)")
+
+  find = commands.add_parser("search", help="find users by name prefix or a misspelled name")
+  find.add_argument("name", help="the start of a name, or a name as best remembered")
+  find.add_argument("--limit", type=int, default=10, help="most users listed")
+  mode = find.add_mutually_exclusive_group()
+  mode.add_argument("--prefix", action="store_true", help="only names starting with NAME")
+  mode.add_argument("--fuzzy", action="store_true", help="only the names closest to NAME")
+  args = parser.parse_args()
+
+  # USERS_DB=<file> picks the database, users.db by default
+  user = UserStore(os.environ.get("USERS_DB", "users.db"))
+  try:
+    if args.command == "import":
+      bulk_import(user, args)
+    elif args.command == "list":
+      list_users(user, args)
+    elif args.command == "ages":
+      age_report(user, args)
+    elif args.command == "search":
+      search_names(user, args)
+    else:
+      add_interactively(user)
+  finally:
+    user.close()
+
+
+if __name__ == "__main__":
+  main()
@@ -1 +1,6 @@
-print("Welcome, User")
+def welcome(name="User"):
+    return f"Welcome, {name}"
+
+
+if __name__ == "__main__":
+    print(welcome())